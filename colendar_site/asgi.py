@@ -1,3 +1,12 @@
+"""
+ASGI entry point. Required for the /api/stream server-sent events endpoint, e.g.
+
+    uvicorn colendar_site.asgi:application --port 8001
+    gunicorn colendar_site.asgi:application -k uvicorn.workers.UvicornWorker -w 1
+
+Change notifications are broadcast in-process, so clients only hear about writes
+handled by the same worker process.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
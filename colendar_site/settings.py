@@ -1,3 +1,4 @@
+import logging
 import os
 from pathlib import Path
 import dj_database_url
@@ -6,6 +7,8 @@ from dotenv import load_dotenv
 # Load environment variables from .env.local file
 load_dotenv('.env.local')
 
+logger = logging.getLogger('colendar.settings')
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,12 +65,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',  # outermost, so latency covers the other middleware
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth_cache.CachedAuthenticationMiddleware',  # AuthenticationMiddleware + AUTH_CACHE
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -100,34 +104,25 @@ WSGI_APPLICATION = 'colendar_site.wsgi.application'
 # Get DATABASE_URL from environment, with fallback to SQLite
 database_url = os.environ.get('DATABASE_URL')
 
-# Debug: Print the DATABASE_URL (remove in production)
-if database_url:
-    print(f"DATABASE_URL found: {database_url[:50]}...")  # Only show first 50 chars for security
-else:
-    print("No DATABASE_URL found, using SQLite")
-
-# Validate and fix DATABASE_URL
+# Validate and fix DATABASE_URL. Settings load before LOGGING is applied, so only
+# warnings (printed by Python's last-resort handler) are reported here.
 valid_database_url = None
 if database_url:
     if database_url.startswith('https://'):
-        print("ERROR: DATABASE_URL is an HTTPS URL, not a database connection string")
-        print("Please set DATABASE_URL to the PostgreSQL connection string from your Render database")
-        print("Falling back to SQLite database")
+        logger.warning("DATABASE_URL is an HTTPS URL, not a database connection string; set it to the "
+                       "PostgreSQL connection string from your Render database. Falling back to SQLite.")
     elif database_url.startswith('postgres://'):
         # Fix for Render's postgres:// URLs (should be postgresql://)
         valid_database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        print("Fixed postgres:// to postgresql://")
     elif database_url.startswith('postgresql://'):
         valid_database_url = database_url
-        print("Valid PostgreSQL URL found")
     else:
-        print(f"Unknown DATABASE_URL format: {database_url[:30]}...")
-        print("Falling back to SQLite database")
+        logger.warning("Unknown DATABASE_URL format (scheme %r); falling back to SQLite",
+                       database_url.split(':', 1)[0])
 
 # Use SQLite if no valid DATABASE_URL
 if not valid_database_url:
     valid_database_url = 'sqlite:///' + str(BASE_DIR / 'db.sqlite3')
-    print("Using SQLite database")
 
 try:
     DATABASES = {
@@ -136,10 +131,8 @@ try:
             conn_max_age=600
         )
     }
-    print("Database configuration successful")
 except Exception as e:
-    print(f"Database configuration failed: {e}")
-    print("Falling back to SQLite")
+    logger.warning("Database configuration failed (%s); falling back to SQLite", e)
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -197,6 +190,46 @@ if not DEBUG:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Items dated before January 1st of (current year - horizon) are moved to the archive
+# table by `manage.py archive_items`; rerun the command after changing this value.
+ITEM_ARCHIVE_HORIZON_YEARS = int(os.environ.get('ITEM_ARCHIVE_HORIZON_YEARS', '1'))
+
+# Session and logged-in user caching (core/auth_cache.py), set with AUTH_CACHE:
+#   off    - read both from the database on every request (default)
+#   locmem - cache them in process memory; only for single-process servers, since a
+#            logout or profile change is not seen by the other processes
+#   file   - cache them in AUTH_CACHE_DIR, shared by all worker processes of a host
+AUTH_CACHE = os.environ.get('AUTH_CACHE', 'off').lower()
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', '300'))  # seconds a cached user is served
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'},
+}
+if AUTH_CACHE == 'file':
+    CACHES['auth'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AUTH_CACHE_DIR', str(BASE_DIR / '.auth_cache')),
+    }
+if AUTH_CACHE != 'off':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'auth'
+
+# Logs go to stderr in logfmt (core/logfmt.py); LOG_LEVEL=debug for more detail
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {'logfmt': {'()': 'core.logfmt.KeyValueFormatter'}},
+    'handlers': {'console': {'class': 'logging.StreamHandler', 'formatter': 'logfmt'}},
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'core': {'level': os.environ.get('LOG_LEVEL', 'INFO').upper()},
+        'colendar': {'level': os.environ.get('LOG_LEVEL', 'INFO').upper()},
+    },
+}
+
+# Bearer token required by /metrics; without one it is only served when DEBUG is on (see core/metrics.py)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Authentication settings
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
@@ -1,20 +1,118 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
 from .models import Event, EventItem
 
 
+def estimated_row_count(model, using: str = "default"):
+    """Row count from planner statistics (Postgres reltuples, SQLite sqlite_stat1), or None if unavailable."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # regclass resolves the name through search_path, like the queries themselves
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "sqlite":
+            try:
+                # Only exists once ANALYZE has run; first number of each stat row is the table size.
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            except DatabaseError:
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # Postgres reports -1 for tables that were never vacuumed/analyzed.
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Skip the exact COUNT(*) on unfiltered changelists of large tables."""
+
+    threshold = 100_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.where:
+            estimate = estimated_row_count(qs.model, qs.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
+
+
+class IndexedSearchMixin:
+    """Admin search that only issues index-backed lookups.
+
+    A numeric term matches the primary/foreign keys in `search_id_fields`; any other term
+    is a case-sensitive prefix match on `search_prefix_field`, or an exact match on
+    `search_username_field` when set (auth_user.username is unique).
+
+    The prefix match is a LIKE 'term%' on PostgreSQL, served by the varchar_pattern_ops
+    index. SQLite's LIKE is case-insensitive and cannot use the BINARY-collated index, so
+    there it is the equivalent range term <= title < term + U+10FFFF.
+    """
+
+    search_id_fields = ("id",)
+    search_prefix_field = "title"
+    search_username_field = None
+
+    def prefix_q(self, queryset, term: str) -> Q:
+        field = self.search_prefix_field
+        if connections[queryset.db].vendor == "sqlite":
+            return Q(**{f"{field}__gte": term, f"{field}__lt": term + "\U0010ffff"})
+        return Q(**{f"{field}__startswith": term})
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            q = Q()
+            for field in self.search_id_fields:
+                q |= Q(**{field: int(term)})
+            return queryset.filter(q), False
+        q = self.prefix_q(queryset, term)
+        if self.search_username_field:
+            q |= Q(**{self.search_username_field: term})
+        return queryset.filter(q), False
+
+
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "color", "user", "created_at", "updated_at")
-    list_filter = ("user",)
-    search_fields = ("title", "user__username", "user__email")
+class EventAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ("id", "title", "color", "user", "items_link", "created_at", "updated_at")
+    raw_id_fields = ("user",)
+    search_fields = ("title",)  # required by EventItemAdmin.autocomplete_fields; see get_search_results
+    search_id_fields = ("id", "user_id")
+    search_username_field = "user__username"
     ordering = ("id",)
+    list_select_related = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description="Items")
+    def items_link(self, obj):
+        url = reverse("admin:core_eventitem_changelist") + f"?event__id__exact={obj.id}"
+        return format_html('<a href="{}">View items</a>', url)
 
 
 @admin.register(EventItem)
-class EventItemAdmin(admin.ModelAdmin):
+class EventItemAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("id", "event", "date", "title", "time")
-    list_filter = ("event", "date", "event__user")
-    search_fields = ("title", "description", "notes", "event__title", "event__user__username")
+    # Filter by event via EventAdmin's "View items" link; a sidebar filter would list every event.
+    list_filter = ("date",)
+    autocomplete_fields = ("event",)
+    search_fields = ("title",)
+    search_id_fields = ("id", "event_id")
     date_hierarchy = "date"
     ordering = ("date", "id")
     list_select_related = ("event",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from . import auth_cache  # noqa: F401  registers the user cache signal handlers
+        from . import broadcast  # noqa: F401  registers the change notification signal handlers
+        from . import snapshots  # noqa: F401  registers the snapshot invalidation signal handlers
+        from . import stats  # noqa: F401  registers the stats invalidation signal handlers
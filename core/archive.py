@@ -0,0 +1,97 @@
+"""Cold storage for old EventItems.
+
+Items dated before the archive cutoff (January 1st, ITEM_ARCHIVE_HORIZON_YEARS years
+before the current year) are moved into ArchivedEventItem by the `archive_items`
+management command, so the hot EventItem table and its indexes only cover recent
+years. Readers call `archived_items()` alongside their EventItem query; it returns
+unsaved EventItem instances and skips the archive entirely when the requested
+range starts at or after the cutoff.
+"""
+from datetime import date, time
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedEventItem, EventItem, bulk_delete, time_range_q
+
+# Columns shared by EventItem and ArchivedEventItem
+ITEM_COLUMNS = ("id", "event_id", "date", "title", "time", "description", "notes", "created_at", "updated_at")
+
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """First date that stays in the hot table."""
+    today = today or date.today()
+    return date(today.year - settings.ITEM_ARCHIVE_HORIZON_YEARS, 1, 1)
+
+
+def archived_items(user, event_ids: Optional[Iterable[int]] = None, start: Optional[date] = None,
+                   end: Optional[date] = None, columns: Optional[Iterable[str]] = None,
+                   start_time: Optional[time] = None, end_time: Optional[time] = None) -> list:
+    """Archived items of `user` as unsaved EventItem instances, optionally limited by event, date and time range.
+
+    Runs no query when the range lies entirely after the cutoff. `columns` restricts the
+    columns read, like QuerySet.only(). Archived dates all precede hot ones, so prepending
+    the result to a date-ordered EventItem list keeps it ordered.
+    """
+    if start is not None and start >= archive_cutoff():
+        return []
+    qs = ArchivedEventItem.objects.filter(event__user=user)
+    if event_ids is not None:
+        qs = qs.filter(event_id__in=list(event_ids))
+    if start is not None:
+        qs = qs.filter(date__gte=start)
+    if end is not None:
+        qs = qs.filter(date__lte=end)
+    if start_time is not None or end_time is not None:
+        qs = qs.filter(time_range_q(start_time, end_time))
+    qs = qs.order_by("date", "time", "id")
+    return [EventItem(**row) for row in qs.values(*(columns or ITEM_COLUMNS))]
+
+
+def _move(source_qs, target_model, batch_size: int) -> int:
+    """Copy rows of source_qs into target_model and delete them, one transaction per batch.
+
+    Sends no model signals: archiving does not change an item, and callers moving items
+    back (which restamps updated_at) invalidate the affected snapshots themselves.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ids = list(source_qs.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return moved
+            rows = source_qs.model.objects.filter(id__in=ids).values(*ITEM_COLUMNS)
+            target_model.objects.bulk_create([target_model(**row) for row in rows])
+            bulk_delete(source_qs.model.objects.filter(id__in=ids))
+            moved += len(ids)
+
+
+def archive_old_items(cutoff: Optional[date] = None, batch_size: int = 5000) -> int:
+    """Move hot items dated before the cutoff into the archive; returns the number moved."""
+    cutoff = cutoff or archive_cutoff()
+    return _move(EventItem.objects.filter(date__lt=cutoff), ArchivedEventItem, batch_size)
+
+
+def restore_recent_items(cutoff: Optional[date] = None, batch_size: int = 5000) -> int:
+    """Move archived items on or after the cutoff back to the hot table (after raising the horizon)."""
+    cutoff = cutoff or archive_cutoff()
+    return _move(ArchivedEventItem.objects.filter(date__gte=cutoff), EventItem, batch_size)
+
+
+def restore_event_items(event_id: int, batch_size: int = 5000) -> int:
+    """Move archived items of one event dated on or after the cutoff back, e.g. after a date shift."""
+    return _move(ArchivedEventItem.objects.filter(event_id=event_id, date__gte=archive_cutoff()), EventItem, batch_size)
+
+
+def restore_item(user, item_id: int) -> Optional[EventItem]:
+    """Move a single archived item of `user` back to the hot table so it can be edited."""
+    with transaction.atomic():
+        row = ArchivedEventItem.objects.filter(id=item_id, event__user=user).values(*ITEM_COLUMNS).first()
+        if row is None:
+            return None
+        # bulk_create inserts the archived id as is (updated_at is restamped through auto_now,
+        # which is fine: callers restore an item to edit or delete it)
+        item = EventItem.objects.bulk_create([EventItem(**row)])[0]
+        ArchivedEventItem.objects.filter(id=item_id).delete()
+    return item
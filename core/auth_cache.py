@@ -0,0 +1,92 @@
+"""Serve the logged-in user from a cache instead of auth_user on every request.
+
+Enabled by settings.AUTH_CACHE (see colendar_site/settings.py), which also switches
+sessions to the cached_db engine, so an authenticated request normally needs no
+query for either. A cached user is only accepted while the session still names it and
+its session hash matches; anything else goes through Django's regular lookup, which
+also handles session verification and flushing. Saving, deleting or logging out a
+user drops its cache entry.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import record_cache_lookup
+
+
+def _enabled() -> bool:
+    return settings.AUTH_CACHE != "off"
+
+
+def _key(user_id) -> str:
+    return f"auth-user:{user_id}"
+
+
+def remember_user(user) -> None:
+    if _enabled():
+        caches[settings.SESSION_CACHE_ALIAS].set(_key(user.pk), user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget_user(user_id) -> None:
+    if _enabled():
+        caches[settings.SESSION_CACHE_ALIAS].delete(_key(user_id))
+
+
+def _cached_session_user(request):
+    """The session's user from the cache, or None unless it is cached and still matches the session."""
+    session = request.session
+    user_id, backend_path = session.get(auth.SESSION_KEY), session.get(auth.BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    user = caches[settings.SESSION_CACHE_ALIAS].get(_key(user_id))
+    if user is None or not constant_time_compare(session.get(auth.HASH_SESSION_KEY, ""), user.get_session_auth_hash()):
+        return None
+    user.backend = backend_path
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, "_cached_user"):
+        user = None
+        if _enabled() and request.session.get(auth.SESSION_KEY) is not None:
+            user = _cached_session_user(request)
+            record_cache_lookup("auth_user", hits=user is not None, misses=user is None)
+        if user is None:
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                remember_user(user)
+        request._cached_user = user
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that resolves request.user through the user cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+@receiver(user_logged_in)
+def _remember_logged_in_user(sender, request, user, **kwargs):
+    remember_user(user)
+
+
+@receiver(user_logged_out)
+def _forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+# Covers settings_view, the admin, password changes and last_login updates
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _forget_changed_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
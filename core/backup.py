@@ -0,0 +1,247 @@
+"""Compact, streamable backups of a user's events and items.
+
+A backup is a gzip stream holding MAGIC followed by length-prefixed records:
+
+    type (1 byte, E or I) | payload length (uint32) | payload
+
+An event payload is its id, created_at and updated_at (int64 microseconds since the
+epoch) followed by title and color; an item payload is its event id, date (uint32
+ordinal) and the two timestamps followed by title, time, description and notes.
+Times are stored as "HH:MM[:SS]" text.
+Strings are a uint32 byte length (0xFFFFFFFF for NULL) and UTF-8 bytes; all integers
+are big-endian. Restores reject records over MAX_RECORD_SIZE before reading them, so a
+crafted length cannot make the server allocate gigabytes. Every event record precedes the item records, so a backup can be
+written from two streaming queries and restored in a single pass over the file;
+items of events created after the first query are left out, keeping the file valid.
+Archived items are included and come back into the hot table on restore. Restored
+rows count as new writes: updated_at is kept in the file but set to the restore time.
+"""
+import gzip
+import struct
+import zlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import BinaryIO, Iterator
+
+from django.db import transaction
+
+from .models import ArchivedEventItem, Event, EventItem, bulk_delete, coerce_item_time, format_item_time
+from .snapshots import invalidate_snapshots
+
+MAGIC = b"COLBAK\x01"
+EVENT, ITEM = b"E", b"I"
+
+EVENT_COLUMNS = ("id", "created_at", "updated_at", "title", "color")
+ITEM_COLUMNS = ("event_id", "date", "created_at", "updated_at", "title", "time", "description", "notes")
+
+_HEADER = struct.Struct(">cI")
+_EVENT = struct.Struct(">qqq")
+_ITEM = struct.Struct(">qIqq")
+_LENGTH = struct.Struct(">I")
+_NULL = 0xFFFFFFFF
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Uncompressed bytes collected before handing a chunk to the compressor
+FLUSH_SIZE = 64 * 1024
+# Rows read per database round trip and inserted per statement
+BATCH_SIZE = 2000
+# Largest record payload a restore accepts (titles and notes are far smaller in practice)
+MAX_RECORD_SIZE = 1024 * 1024
+
+
+class BackupError(ValueError):
+    """The file is not a valid backup."""
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _datetime(micros: int) -> datetime:
+    return _EPOCH + micros * _MICROSECOND
+
+
+def _pack_texts(*values) -> bytes:
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append(_LENGTH.pack(_NULL))
+        else:
+            data = value.encode("utf-8")
+            parts.append(_LENGTH.pack(len(data)))
+            parts.append(data)
+    return b"".join(parts)
+
+
+def _unpack_texts(payload: bytes, offset: int, count: int) -> list:
+    values = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(payload, offset)
+        offset += _LENGTH.size
+        if length == _NULL:
+            values.append(None)
+            continue
+        values.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    if offset != len(payload):
+        raise BackupError("Malformed record")
+    return values
+
+
+def _record(kind: bytes, payload: bytes) -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_event(event_id: int, created_at: datetime, updated_at: datetime, title: str, color: str) -> bytes:
+    return _record(EVENT, _EVENT.pack(event_id, _micros(created_at), _micros(updated_at)) + _pack_texts(title, color))
+
+
+def encode_item(event_id: int, day: date, created_at: datetime, updated_at: datetime,
+                title: str, time, description, notes) -> bytes:
+    head = _ITEM.pack(event_id, day.toordinal(), _micros(created_at), _micros(updated_at))
+    if not isinstance(time, (str, type(None))):
+        time = format_item_time(time)
+    return _record(ITEM, head + _pack_texts(title, time, description, notes))
+
+
+def _records(user) -> Iterator[bytes]:
+    event_ids = set()
+    events = Event.objects.filter(user=user).order_by("id").values_list(*EVENT_COLUMNS)
+    for row in events.iterator(chunk_size=BATCH_SIZE):
+        event_ids.add(row[0])
+        yield encode_event(*row)
+    # Both item tables in one statement, so rows that archive_items or a restore moves
+    # between them meanwhile are read exactly once
+    items = (
+        ArchivedEventItem.objects.filter(event__user=user).values_list(*ITEM_COLUMNS)
+        .union(EventItem.objects.filter(event__user=user).values_list(*ITEM_COLUMNS), all=True)
+        .order_by("event_id", "date")
+    )
+    for row in items.iterator(chunk_size=BATCH_SIZE):
+        if row[0] in event_ids:  # events created after they were read are not in the backup
+            yield encode_item(*row)
+
+
+def compress(records, level: int = 6) -> Iterator[bytes]:
+    """Gzip MAGIC plus the given records into a stream of chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    buffer = bytearray(MAGIC)
+    for record in records:
+        buffer += record
+        if len(buffer) >= FLUSH_SIZE:
+            chunk = compressor.compress(bytes(buffer))
+            buffer.clear()
+            if chunk:
+                yield chunk
+    yield compressor.compress(bytes(buffer)) + compressor.flush()
+
+
+def backup_chunks(user) -> Iterator[bytes]:
+    """Compressed backup of every event and item of `user`, produced while the rows stream in."""
+    return compress(_records(user))
+
+
+def _read(stream, size: int) -> bytes:
+    try:
+        return stream.read(size)
+    except (OSError, EOFError, zlib.error) as e:  # not gzip, truncated or corrupt
+        raise BackupError(f"Unreadable backup: {e}") from e
+
+
+def _read_records(stream) -> Iterator[tuple]:
+    while True:
+        header = _read(stream, _HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise BackupError("Truncated backup")
+        kind, length = _HEADER.unpack(header)
+        if length > MAX_RECORD_SIZE:
+            raise BackupError(f"Record of {length} bytes exceeds the {MAX_RECORD_SIZE} byte limit")
+        payload = _read(stream, length)
+        if len(payload) < length:
+            raise BackupError("Truncated backup")
+        yield kind, payload
+
+
+def _decode(payload: bytes, head: struct.Struct, texts: int) -> tuple:
+    """Fixed-size fields followed by `texts` strings of a record payload."""
+    return head.unpack_from(payload) + tuple(_unpack_texts(payload, head.size, texts))
+
+
+def _decode_event(payload: bytes, user) -> tuple:
+    """(backed-up id, unsaved Event) of an event record."""
+    try:
+        backup_id, created, _, title, color = _decode(payload, _EVENT, 2)
+        return backup_id, Event(user=user, title=title, color=color, created_at=_datetime(created))
+    except (struct.error, ValueError, OverflowError) as e:
+        raise BackupError("Malformed event record") from e
+
+
+def _decode_item(payload: bytes) -> tuple:
+    """(backed-up event id, unsaved EventItem without event) of an item record."""
+    try:
+        event_id, ordinal, created, _, title, time, description, notes = _decode(payload, _ITEM, 4)
+        # Backups made while times were free text may hold text that is no time of day
+        time, notes = coerce_item_time(time, notes)
+        return event_id, EventItem(
+            date=date.fromordinal(ordinal), title=title, time=time, description=description, notes=notes,
+            created_at=_datetime(created),
+        )
+    except (struct.error, ValueError, OverflowError) as e:
+        raise BackupError("Malformed item record") from e
+
+
+def _create_events(new_events: list) -> dict:
+    """Insert the collected events; returns backed-up id -> new id."""
+    Event.objects.bulk_create([event for _, event in new_events], batch_size=BATCH_SIZE)
+    return {backup_id: event.id for backup_id, event in new_events}
+
+
+def restore_backup(user, fileobj: BinaryIO, replace: bool = False) -> dict:
+    """Read a backup from fileobj into `user`'s account in one transaction.
+
+    Events get new ids; with replace=True the account's existing events and items are
+    deleted first. Raises BackupError, leaving the account untouched, when the file is
+    invalid. All of the account's year snapshots are dropped when the restore commits.
+    """
+    stream = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if _read(stream, len(MAGIC)) != MAGIC:
+        raise BackupError("Not a colendar backup")
+
+    with transaction.atomic():
+        invalidate_snapshots(user.id)
+        if replace:
+            # Delete items, then events, without loading them for their signals, which
+            # would only invalidate the snapshots already dropped above
+            for model in (EventItem, ArchivedEventItem):
+                bulk_delete(model.objects.filter(event__user=user))
+            bulk_delete(Event.objects.filter(user=user))
+        new_events, event_ids = [], None  # event_ids is set once the events are written
+        items, item_count = [], 0
+        for kind, payload in _read_records(stream):
+            if kind == EVENT:
+                if event_ids is not None:
+                    raise BackupError("Event record after item records")
+                new_events.append(_decode_event(payload, user))
+            elif kind == ITEM:
+                if event_ids is None:
+                    event_ids = _create_events(new_events)
+                backup_event_id, item = _decode_item(payload)
+                if backup_event_id not in event_ids:
+                    raise BackupError("Item of an unknown event")
+                item.event_id = event_ids[backup_event_id]
+                items.append(item)
+                if len(items) >= BATCH_SIZE:
+                    EventItem.objects.bulk_create(items)
+                    item_count += len(items)
+                    items = []
+            else:
+                raise BackupError("Unknown record type")
+        if event_ids is None:
+            _create_events(new_events)
+        if items:
+            EventItem.objects.bulk_create(items)
+            item_count += len(items)
+    return {"events": len(new_events), "items": item_count}
@@ -0,0 +1,111 @@
+"""In-process fan-out of change notifications to the server-sent events stream.
+
+Saving or deleting an Event or item, from the views, the admin or any other ORM write,
+publishes through the model signals below; bulk writes, which send no signals, call
+`notify_change()` themselves. Once the write commits, every open `/api/stream`
+connection of the owning user receives a compact message such as
+
+    {"kind": "item", "id": 12, "op": "update", "version": 7, "event_id": 3, "date": "2025-08-12"}
+
+Subscribers live in the memory of the ASGI process that accepted the connection,
+so notifications only reach clients connected to the same process as the writer
+(not those of writes made by management commands, for example).
+"""
+import asyncio
+import itertools
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ArchivedEventItem, Event, EventItem
+
+# Messages a slow client may have pending before it is told to resync instead
+QUEUE_SIZE = 100
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # user_id -> {(queue, loop)}
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+
+    def has_subscribers(self, user_id: Optional[int] = None) -> bool:
+        """Whether user_id (anyone when None) has an open connection to this process."""
+        if user_id is None:
+            return bool(self._subscribers)
+        return bool(self._subscribers.get(user_id))
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a queue for user_id on the running event loop."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[0] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id: int, message: dict) -> None:
+        """Queue message for every connection of user_id; safe to call from any thread."""
+        message = {**message, "version": next(self._versions)}
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: dict) -> None:
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind; drop the backlog and ask it to reload everything.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"kind": "all", "op": "resync", "version": message["version"]})
+
+
+broadcaster = Broadcaster()
+
+
+def notify_change(user_id: int, kind: str, obj_id: Optional[int], op: str, **extra) -> None:
+    """Publish a change to user_id's connected clients once the current transaction commits."""
+    if not broadcaster.has_subscribers(user_id):
+        return
+    message = {"kind": kind, "id": obj_id, "op": op, **extra}
+    transaction.on_commit(lambda: broadcaster.publish(user_id, message))
+
+
+def _owner_id(item) -> Optional[int]:
+    if type(item).event.is_cached(item):
+        return item.event.user_id
+    return Event.objects.filter(id=item.event_id).values_list("user_id", flat=True).first()
+
+
+@receiver(post_save, sender=EventItem)
+@receiver(post_save, sender=ArchivedEventItem)
+@receiver(post_delete, sender=EventItem)
+@receiver(post_delete, sender=ArchivedEventItem)
+def _item_written(sender, instance, signal, created=False, **kwargs):
+    if not broadcaster.has_subscribers():  # spare the owner lookup when nobody listens here
+        return
+    op = "delete" if signal is post_delete else "create" if created else "update"
+    extra = {}
+    if instance.loaded_date is not None and instance.loaded_date != instance.date:
+        extra["previous_date"] = instance.loaded_date.isoformat()
+    notify_change(_owner_id(instance), "item", instance.id, op,
+                  event_id=instance.event_id, date=instance.date.isoformat(), **extra)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def _event_written(sender, instance, signal, created=False, **kwargs):
+    op = "delete" if signal is post_delete else "create" if created else "update"
+    notify_change(instance.user_id, "event", instance.id, op)
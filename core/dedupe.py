@@ -0,0 +1,163 @@
+"""Set-based detection and removal of duplicate EventItems.
+
+Items are duplicates when they share (event, date, title), whether they live in the hot
+EventItem table or in the archive (core/archive.py); the one with the lowest id is kept.
+Everything runs in a fixed number of queries regardless of table size: one grouped
+query per table to count, one to read the rows of duplicate groups when notes are
+merged, one bulk UPDATE per table for the merged notes and one DELETE per table for
+the extra rows.
+
+`add_unique_index()` optionally backs the rule with a unique index so that inserts
+racing each other (double-clicks while painting) can no longer create duplicates. The
+index only covers the hot table, so in that mode writes dated before the archive
+cutoff look for an archived copy with `archived_duplicate()` first.
+"""
+from datetime import date
+from typing import Optional
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BooleanField, Count, Exists, Min, OuterRef, Value
+
+from .archive import ITEM_COLUMNS, archive_cutoff
+from .models import ArchivedEventItem, EventItem, bulk_delete
+
+UNIQUE_INDEX_NAME = "core_item_unique_event_date_title"
+ITEM_MODELS = (EventItem, ArchivedEventItem)
+
+
+def _items(model, user=None):
+    qs = model.objects.all()
+    return qs if user is None else qs.filter(event__user=user)
+
+
+def _same_key(model, **extra):
+    return model.objects.filter(
+        event_id=OuterRef("event_id"), date=OuterRef("date"), title=OuterRef("title"), **extra
+    )
+
+
+def _group_members(qs):
+    """Every item of qs that shares its key with another item of either table (keepers included)."""
+    return qs.filter(Exists(_same_key(EventItem).exclude(id=OuterRef("id")))
+                     | Exists(_same_key(ArchivedEventItem).exclude(id=OuterRef("id"))))
+
+
+def _extra_copies(qs):
+    """Items of qs that have an older item with the same key (i.e. everything but the keepers)."""
+    return qs.filter(Exists(_same_key(EventItem, id__lt=OuterRef("id")))
+                     | Exists(_same_key(ArchivedEventItem, id__lt=OuterRef("id"))))
+
+
+def duplicate_groups(user=None) -> list:
+    """(event_id, date, title, count, keep_id) rows for every duplicated key, of one user or everyone.
+
+    One grouped query per item table; groups spanning both tables are combined here.
+    """
+    groups = {}
+    for model in ITEM_MODELS:
+        rows = (
+            _group_members(_items(model, user)).values("event_id", "date", "title")
+            .annotate(count=Count("id"), keep_id=Min("id")).order_by()
+        )
+        for row in rows:
+            key = (row["event_id"], row["date"], row["title"])
+            group = groups.setdefault(key, {**row, "count": 0})
+            group["count"] += row["count"]
+            group["keep_id"] = min(group["keep_id"], row["keep_id"])
+    return list(groups.values())
+
+
+def merge_duplicates(user=None, merge_notes: bool = True) -> dict:
+    """Delete duplicate items of user (everyone when None), optionally appending their notes to the kept item.
+
+    Returns counts of duplicate groups and deleted rows plus the affected event ids.
+    """
+    with transaction.atomic():
+        groups = {(g["event_id"], g["date"], g["title"]): g["keep_id"] for g in duplicate_groups(user)}
+        if not groups:
+            return {"groups": 0, "deleted": 0, "merged": 0, "event_ids": set()}
+
+        merged = 0
+        if merge_notes:
+            keepers = {}
+            notes = {}
+            archived_keepers = set()
+            rows = _group_members(_items(EventItem, user)).annotate(
+                archived=Value(False, output_field=BooleanField())
+            ).values_list("id", "event_id", "date", "title", "notes", "archived").union(
+                _group_members(_items(ArchivedEventItem, user)).annotate(
+                    archived=Value(True, output_field=BooleanField())
+                ).values_list("id", "event_id", "date", "title", "notes", "archived"),
+                all=True,
+            )
+            for item_id, event_id, day, title, note, archived in sorted(rows, key=lambda row: row[0]):
+                keep_id = groups[(event_id, day, title)]
+                parts = notes.setdefault(keep_id, [])
+                if item_id == keep_id:
+                    keepers[keep_id] = note
+                    if archived:
+                        archived_keepers.add(keep_id)
+                if note and note.strip() and note not in parts:
+                    parts.append(note)
+            updates = {EventItem: [], ArchivedEventItem: []}
+            for keep_id, parts in notes.items():
+                combined = "\n\n".join(parts)
+                if combined != (keepers.get(keep_id) or ""):
+                    model = ArchivedEventItem if keep_id in archived_keepers else EventItem
+                    updates[model].append(model(id=keep_id, notes=combined))
+            for model, changed in updates.items():
+                if changed:
+                    model.objects.bulk_update(changed, ["notes"])
+                    merged += len(changed)
+
+        # No per-row signals; callers invalidate stats and snapshots of the returned events
+        deleted = sum(bulk_delete(_extra_copies(_items(model, user))) for model in ITEM_MODELS)
+    return {
+        "groups": len(groups),
+        "deleted": deleted,
+        "merged": merged,
+        "event_ids": {key[0] for key in groups},
+    }
+
+
+def unique_index_exists() -> bool:
+    with connection.cursor() as cursor:
+        return UNIQUE_INDEX_NAME in connection.introspection.get_constraints(cursor, EventItem._meta.db_table)
+
+
+def archived_duplicate(event_id: int, day: date, title: str) -> Optional[EventItem]:
+    """The archived item a new (event, date, title) would duplicate, when the unique index is in place.
+
+    Runs no query for dates on or after the archive cutoff, which the index covers itself.
+    """
+    if day >= archive_cutoff() or not unique_index_exists():
+        return None
+    row = (ArchivedEventItem.objects.filter(event_id=event_id, date=day, title=title)
+           .order_by("id").values(*ITEM_COLUMNS).first())
+    return EventItem(**row) if row else None
+
+
+def add_unique_index() -> None:
+    """Create the optional unique (event, date, title) index; duplicates must be merged first.
+
+    On PostgreSQL the index is built CONCURRENTLY so writes go on meanwhile, which needs
+    autocommit (no surrounding transaction).
+    """
+    concurrently = " CONCURRENTLY" if connection.vendor == "postgresql" else ""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE UNIQUE INDEX{concurrently} IF NOT EXISTS {UNIQUE_INDEX_NAME} "
+                f"ON {EventItem._meta.db_table} (event_id, date, title)"
+            )
+        except IntegrityError:
+            if concurrently:
+                # A failed concurrent build leaves an invalid index behind that IF NOT EXISTS would keep
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_INDEX_NAME}")
+            raise
+
+
+def drop_unique_index() -> None:
+    concurrently = " CONCURRENTLY" if connection.vendor == "postgresql" else ""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX{concurrently} IF EXISTS {UNIQUE_INDEX_NAME}")
@@ -0,0 +1,107 @@
+"""Set-based clone, date shift and deletion of all items of an event.
+
+Both take a fixed number of statements however many items the event has: cloning
+copies its hot and archived items into the new event with one INSERT ... SELECT,
+shifting moves them with one UPDATE per item table. Dates are shifted by the
+database (date + interval), so no item is loaded into Python.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BigIntegerField, DateField, DateTimeField, F, Max, Min, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .archive import restore_event_items
+from .models import ArchivedEventItem, Event, EventItem, bulk_delete
+
+# Columns written by clone_items(), in INSERT order
+CLONED_COLUMNS = ("event_id", "date", "title", "time", "description", "notes", "created_at", "updated_at")
+
+
+def _shifted_date(days: int):
+    return Cast(F("date") + timedelta(days=days), DateField())
+
+
+def item_date_range(event: Event) -> Optional[tuple]:
+    """(first, last) item date of event across the hot and archive tables, or None without items."""
+    bounds = [
+        model.objects.filter(event=event).aggregate(first=Min("date"), last=Max("date"))
+        for model in (EventItem, ArchivedEventItem)
+    ]
+    firsts = [b["first"] for b in bounds if b["first"] is not None]
+    lasts = [b["last"] for b in bounds if b["last"] is not None]
+    return (min(firsts), max(lasts)) if firsts else None
+
+
+def check_shift(bounds: Optional[tuple], days: int) -> None:
+    """Raise ValueError if moving items spanning `bounds` by `days` leaves the supported date range."""
+    if bounds:
+        try:
+            bounds[0] + timedelta(days=days), bounds[1] + timedelta(days=days)
+        except OverflowError:
+            raise ValueError(f"Shifting by {days} days moves items outside {date.min} - {date.max}")
+
+
+def clone_items(source: Event, target: Event, days: int = 0) -> int:
+    """Copy every item of source into target, `days` later, with one INSERT ... SELECT; returns the count."""
+    now = timezone.now()
+
+    def select(model):
+        columns = {
+            "c_event": Value(target.id, output_field=BigIntegerField()),
+            "c_date": _shifted_date(days),
+            "c_title": F("title"),
+            "c_time": F("time"),
+            "c_description": F("description"),
+            "c_notes": F("notes"),
+            "c_created": Value(now, output_field=DateTimeField()),
+            "c_updated": Value(now, output_field=DateTimeField()),
+        }
+        return model.objects.filter(event=source).annotate(**columns).values_list(*columns)
+
+    sql, params = select(EventItem).union(select(ArchivedEventItem), all=True).query.sql_with_params()
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(EventItem._meta.db_table)} ({', '.join(qn(c) for c in CLONED_COLUMNS)}) {sql}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def _shift(model, from_event_id: int, to_event_id: int, days: int) -> int:
+    return model.objects.filter(event_id=from_event_id).update(
+        event_id=to_event_id, date=_shifted_date(days), updated_at=timezone.now())
+
+
+def delete_event(event: Event) -> None:
+    """Delete event with one DELETE per item table instead of a delete signal per item.
+
+    The event's own post_delete signal drops its user's snapshots (core/snapshots.py).
+    """
+    with transaction.atomic():
+        for model in (EventItem, ArchivedEventItem):
+            bulk_delete(model.objects.filter(event=event))
+        event.delete()
+
+
+def shift_items(event: Event, days: int) -> int:
+    """Move every item of event by `days` with one UPDATE per item table; returns the count."""
+    with transaction.atomic():
+        shifted = _shift(ArchivedEventItem, event.id, event.id, days)
+        try:
+            with transaction.atomic():
+                shifted += _shift(EventItem, event.id, event.id, days)
+        except IntegrityError:
+            # The optional unique (event, date, title) index (core/dedupe.py) is checked row by
+            # row, so a shifted row can hit one that has not moved yet. Park the items on a
+            # placeholder event first; moving them back they only meet already shifted rows.
+            placeholder = Event.objects.create(user_id=event.user_id, title=event.title, color=event.color)
+            EventItem.objects.filter(event=event).update(event=placeholder)
+            shifted += _shift(EventItem, placeholder.id, event.id, days)
+            placeholder.delete()
+        # Archived items moved past the cutoff belong in the hot table again
+        restore_event_items(event.id)
+    return shifted
@@ -0,0 +1,33 @@
+"""logfmt output for the `logging` configuration in settings.py.
+
+Values passed through `extra=` become key=value pairs after the message, e.g.
+
+    time=2025-08-12T09:00:00 level=info logger=core.views msg="import finished" user_id=3 items_created=120
+"""
+import logging
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _value(value) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields.update((k, v) for k, v in vars(record).items() if k not in _STANDARD)
+        line = " ".join(f"{key}={_value(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
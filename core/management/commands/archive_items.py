@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_cutoff, archive_old_items, restore_recent_items
+from core.broadcast import notify_change
+from core.dedupe import merge_duplicates, unique_index_exists
+from core.models import ArchivedEventItem, Event
+from core.snapshots import invalidate_snapshots
+from core.stats import mark_items_changed
+
+
+class Command(BaseCommand):
+    help = "Move EventItems older than the archive horizon into the archive table (and bring back newer ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="rows moved per transaction")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+        if unique_index_exists():
+            # Archived copies of hot items would break the unique index when moved back
+            result = merge_duplicates()
+            mark_items_changed(result["event_ids"])
+            owners = dict(Event.objects.filter(id__in=result["event_ids"]).values_list("id", "user_id"))
+            for user_id in set(owners.values()):
+                invalidate_snapshots(user_id)
+            for event_id, user_id in owners.items():  # the bulk merge sends no per-row signals
+                notify_change(user_id, "event", event_id, "items")
+            if result["deleted"]:
+                self.stdout.write(f"Merged {result['groups']} duplicate groups: deleted {result['deleted']} items")
+        # Moving items back restamps their updated_at, which their year snapshots include
+        restored_users = set(ArchivedEventItem.objects.filter(date__gte=cutoff)
+                             .values_list("event__user_id", flat=True).distinct())
+        restored = restore_recent_items(cutoff, options["batch_size"])
+        for user_id in restored_users:
+            invalidate_snapshots(user_id)
+        archived = archive_old_items(cutoff, options["batch_size"])
+        self.stdout.write(f"Cutoff {cutoff.isoformat()}: archived {archived} items, restored {restored} items")
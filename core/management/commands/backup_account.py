@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import backup_chunks
+
+
+class Command(BaseCommand):
+    help = "Write a compressed backup of a user's events and items (restore it with restore_account)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("output", help="backup file to write")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}")
+        size = 0
+        with open(options["output"], "wb") as f:
+            for chunk in backup_chunks(user):
+                f.write(chunk)
+                size += len(chunk)
+        self.stdout.write(f"Wrote {size} bytes to {options['output']}")
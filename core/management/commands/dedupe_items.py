@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core.broadcast import notify_change
+from core.dedupe import add_unique_index, drop_unique_index, duplicate_groups, merge_duplicates
+from core.models import Event
+from core.snapshots import invalidate_snapshots
+from core.stats import mark_items_changed
+
+
+class Command(BaseCommand):
+    help = "Merge EventItems that share (event, date, title), optionally enforcing it with a unique index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only report duplicate counts")
+        parser.add_argument("--no-merge-notes", action="store_true", help="drop the notes of removed copies")
+        parser.add_argument("--add-unique-index", action="store_true",
+                            help="after merging, create a unique (event, date, title) index")
+        parser.add_argument("--drop-unique-index", action="store_true", help="remove the unique index and exit")
+
+    def handle(self, *args, **options):
+        if options["drop_unique_index"]:
+            drop_unique_index()
+            self.stdout.write("Dropped unique index")
+            return
+
+        if options["dry_run"]:
+            groups = list(duplicate_groups())
+            extra = sum(g["count"] - 1 for g in groups)
+            self.stdout.write(f"{len(groups)} duplicate groups, {extra} extra items")
+            return
+
+        result = merge_duplicates(merge_notes=not options["no_merge_notes"])
+        mark_items_changed(result["event_ids"])
+        owners = dict(Event.objects.filter(id__in=result["event_ids"]).values_list("id", "user_id"))
+        for user_id in set(owners.values()):
+            invalidate_snapshots(user_id)
+        for event_id, user_id in owners.items():  # the bulk merge sends no per-row signals
+            notify_change(user_id, "event", event_id, "items")
+        self.stdout.write(
+            f"Merged {result['groups']} duplicate groups: deleted {result['deleted']} items, "
+            f"combined notes on {result['merged']}"
+        )
+
+        if options["add_unique_index"]:
+            try:
+                add_unique_index()
+            except IntegrityError as e:
+                raise CommandError(f"Could not create unique index (new duplicates appeared?): {e}")
+            self.stdout.write("Created unique index")
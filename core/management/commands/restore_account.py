@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import BackupError, restore_backup
+
+
+class Command(BaseCommand):
+    help = "Load a backup written by backup_account (or GET /api/backup) into a user's account."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("input", help="backup file to read")
+        parser.add_argument("--replace", action="store_true",
+                            help="delete the user's existing events and items first")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}")
+        with open(options["input"], "rb") as f:
+            try:
+                result = restore_backup(user, f, replace=options["replace"])
+            except BackupError as e:
+                raise CommandError(f"Restore failed: {e}")
+        self.stdout.write(f"Restored {result['events']} events and {result['items']} items")
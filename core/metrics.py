@@ -0,0 +1,81 @@
+"""Prometheus metrics, exposed in text format at /metrics.
+
+Each process records into prometheus_client's registry. When PROMETHEUS_MULTIPROC_DIR
+is set (it must be, and point at an empty directory, before the server starts) the
+values are kept in memory-mapped files there and /metrics adds up every worker's
+files, so any gunicorn worker can answer the scrape; gunicorn.conf.py cleans the
+directory up as workers come and go.
+"""
+import os
+import time
+
+from django.db import connection
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Other methods are recorded as "other" to keep the number of series bounded
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUEST_LATENCY = Histogram(
+    "colendar_request_duration_seconds", "Time to produce a response, by URL name",
+    ["view", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter("colendar_requests_total", "Responses by URL name and status", ["view", "method", "status"])
+REQUEST_QUERIES = Histogram(
+    "colendar_request_db_queries", "SQL queries run while producing a response, by URL name",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+CACHE_LOOKUPS = Counter("colendar_cache_lookups_total", "Cache lookups by cache and result (hit/miss)",
+                        ["cache", "result"])
+IMPORTED_ITEMS = Counter("colendar_imported_items_total", "Items processed by imports, by source and result",
+                         ["source", "result"])
+IMPORT_DURATION = Histogram("colendar_import_duration_seconds", "Duration of imports and restores", ["source"])
+
+
+def record_cache_lookup(cache: str, hits: int, misses: int = 0) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def render() -> bytes:
+    """Current metrics in Prometheus text format, across all workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """Record latency, status and query count of every request under its URL name.
+
+    Time and queries are measured until the view returns, so the body of a streaming
+    response is not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+        REQUEST_LATENCY.labels(view, method).observe(elapsed)
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+        REQUEST_QUERIES.labels(view).observe(queries)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_event_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventitem',
+            index=models.Index(fields=['date', 'id'], name='core_item_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventitem',
+            index=models.Index(fields=['title'], name='core_item_title_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
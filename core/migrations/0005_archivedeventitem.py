@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_eventitem_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEventItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('title', models.CharField(max_length=255)),
+                ('time', models.CharField(blank=True, max_length=16, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_items', to='core.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'date'], name='core_archived_event_date_idx')],
+            },
+        ),
+    ]
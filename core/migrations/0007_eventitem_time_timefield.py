@@ -0,0 +1,111 @@
+# Generated by Django 5.0.7 on 2026-10-19 21:40
+
+import re
+from datetime import time
+
+from django.db import migrations, models
+from django.db.models import TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+# Frozen copy of core.models.parse_item_time
+_TIME_RE = re.compile(r"^(\d{1,2})(?:([:.h])(\d{2})(?::(\d{2}))?|(\d{2})|(h))?\s*(?:([ap])\.?m\.?)?$", re.IGNORECASE)
+
+
+def _parse(text):
+    match = _TIME_RE.match(text)
+    if not match:
+        raise ValueError(text)
+    hour, separator, minute, second, compact_minute, hour_suffix, meridiem = match.groups()
+    if not (separator or hour_suffix or meridiem):
+        raise ValueError(text)
+    hour, minute, second = int(hour), int(minute or compact_minute or 0), int(second or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(text)
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    return time(hour, minute, second)
+
+
+def backfill_times(apps, schema_editor):
+    """Fill the new time column with one UPDATE per distinct text value.
+
+    Blank text becomes NULL; text that is not a time of day is kept at the top of the notes.
+    """
+    for name in ("EventItem", "ArchivedEventItem"):
+        model = apps.get_model("core", name)
+        texts = list(model.objects.exclude(time_text__isnull=True).values_list("time_text", flat=True).distinct())
+        for text in texts:
+            if not text.strip():
+                continue
+            rows = model.objects.filter(time_text=text)
+            try:
+                rows.update(time=_parse(text.strip()))
+            except ValueError:
+                note = Value(f"Time: {text.strip()}\n", output_field=TextField())
+                rows.update(notes=Concat(note, Coalesce("notes", Value("", output_field=TextField())),
+                                         output_field=TextField()))
+
+
+def restore_time_text(apps, schema_editor):
+    for name in ("EventItem", "ArchivedEventItem"):
+        model = apps.get_model("core", name)
+        for value in list(model.objects.exclude(time__isnull=True).values_list("time", flat=True).distinct()):
+            text = value.strftime("%H:%M:%S" if value.second else "%H:%M")
+            model.objects.filter(time=value).update(time_text=text)
+
+
+def drop_snapshots(apps, schema_editor):
+    """Snapshots hold the old time strings and notes; they are rebuilt on the next request."""
+    apps.get_model("core", "YearSnapshot").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_yearsnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedeventitem',
+            name='core_archived_event_date_idx',
+        ),
+        migrations.RenameField(
+            model_name='eventitem',
+            old_name='time',
+            new_name='time_text',
+        ),
+        migrations.RenameField(
+            model_name='archivedeventitem',
+            old_name='time',
+            new_name='time_text',
+        ),
+        migrations.AddField(
+            model_name='eventitem',
+            name='time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedeventitem',
+            name='time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_times, restore_time_text),
+        migrations.RunPython(drop_snapshots, drop_snapshots),
+        migrations.RemoveField(
+            model_name='eventitem',
+            name='time_text',
+        ),
+        migrations.RemoveField(
+            model_name='archivedeventitem',
+            name='time_text',
+        ),
+        migrations.AddIndex(
+            model_name='eventitem',
+            index=models.Index(fields=['event', 'date', 'time'], name='core_item_event_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedeventitem',
+            index=models.Index(fields=['event', 'date', 'time'], name='core_archived_event_time_idx'),
+        ),
+    ]
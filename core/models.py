@@ -1,16 +1,117 @@
-from django.db import models
+import re
+from datetime import time
+from typing import Optional
+
+from django.db import connections, models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+# "9:30", "09:30:15", "9.30", "14h30", "14h", "930pm", "2 pm", "2:30 p.m."; digits alone ("930", "2025")
+# are as likely a year or a count as a time, so they need a separator, "h" or am/pm
+_TIME_RE = re.compile(r"^(\d{1,2})(?:([:.h])(\d{2})(?::(\d{2}))?|(\d{2})|(h))?\s*(?:([ap])\.?m\.?)?$", re.IGNORECASE)
+
+
+def parse_item_time(value) -> Optional[time]:
+    """Parse a time of day as sent by clients; None for empty values, ValueError for anything else."""
+    if value is None or isinstance(value, time):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    match = _TIME_RE.match(text)
+    if not match:
+        raise ValueError(f"Not a time of day: {text!r}")
+    hour, separator, minute, second, compact_minute, hour_suffix, meridiem = match.groups()
+    if not (separator or hour_suffix or meridiem):
+        raise ValueError(f"Not a time of day: {text!r}")
+    hour, minute, second = int(hour), int(minute or compact_minute or 0), int(second or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Not a time of day: {text!r}")
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    return time(hour, minute, second)  # raises ValueError when out of range
+
+
+def coerce_item_time(value, notes: Optional[str]) -> tuple:
+    """(time, notes) for free-form time text from imports and old backups.
+
+    Text that is not a time of day is kept at the top of the notes instead of being lost,
+    as the migration to a TimeField did with existing values.
+    """
+    try:
+        return parse_item_time(value), notes
+    except ValueError:
+        return None, f"Time: {str(value).strip()}\n{notes or ''}"
+
+
+def format_item_time(value: Optional[time]) -> Optional[str]:
+    """API representation of a time: "HH:MM", or "HH:MM:SS" when it has seconds."""
+    if value is None:
+        return None
+    return value.strftime("%H:%M:%S" if value.second else "%H:%M")
+
+
+def bulk_delete(qs) -> int:
+    """Delete the rows of qs with a single DELETE statement and return how many went.
+
+    Unlike QuerySet.delete(), which loads every row to send post_delete while receivers are
+    connected (core/snapshots.py, core/stats.py), this sends no signals: bulk writers call
+    the invalidations they need once. Rows referenced by other tables must not be passed.
+    """
+    model = qs.model
+    connection = connections[qs.db]
+    sql, params = qs.order_by().values("pk").query.sql_with_params()
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN ({sql})", params)
+        return cursor.rowcount
+
+
+def time_range_q(start: Optional[time], end: Optional[time]) -> models.Q:
+    """Filter on items whose time lies in [start, end]; start after end wraps past midnight.
+
+    Items without a time never match a bounded range.
+    """
+    if start is not None and end is not None and start > end:
+        return models.Q(time__gte=start) | models.Q(time__lte=end)
+    q = models.Q()
+    if start is not None:
+        q &= models.Q(time__gte=start)
+    if end is not None:
+        q &= models.Q(time__lte=end)
+    return q
+
+
+def _project(obj, fields) -> dict:
+    """Serialize only `fields` of obj, touching no other attribute so deferred columns stay unloaded."""
+    data = {"id": obj.id}
+    for name in fields:
+        value = getattr(obj, name)
+        if isinstance(value, time):
+            value = format_item_time(value)
+        data[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    return data
+
 
 class Event(models.Model):
+    # Keys of to_dict() that API callers may select with ?fields=
+    API_FIELDS = ("id", "title", "color", "created_at", "updated_at", "items")
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="events")
     title = models.CharField(max_length=200)
     color = models.CharField(max_length=7)  # e.g. #RRGGBB
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def to_dict(self, include_items: bool = True) -> dict:
+    def __str__(self) -> str:
+        return self.title
+
+    def to_dict(self, include_items: bool = True, fields=None) -> dict:
+        if fields is not None:
+            data = _project(self, [f for f in fields if f != "items"])
+            if "items" in fields:
+                data["items"] = [item.to_dict() for item in self.items.all()]
+            return data
         data = {
             "id": self.id,
             "title": self.title,
@@ -23,25 +124,90 @@ class Event(models.Model):
         return data
 
 
-class EventItem(models.Model):
+class TracksLoadedDate:
+    """Remember the date a row was loaded with, so a save that moves it to another year is visible."""
+
+    loaded_date = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_date = instance.__dict__.get("date")  # None when deferred
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the date it moved from; a later save moves from this one
+        self.loaded_date = self.date
+
+
+class EventItem(TracksLoadedDate, models.Model):
+    # Keys of to_dict() that API callers may select with ?fields=
+    API_FIELDS = ("id", "event_id", "date", "title", "time", "description", "notes", "created_at", "updated_at")
+
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="items")
     date = models.DateField()
     title = models.CharField(max_length=255)
-    time = models.CharField(max_length=16, null=True, blank=True)
+    time = models.TimeField(null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     notes = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def to_dict(self) -> dict:
+    class Meta:
+        indexes = [
+            # Chronological order within an event and time-of-day ranges (?start_time=&end_time=)
+            models.Index(fields=["event", "date", "time"], name="core_item_event_date_time_idx"),
+            # Admin changelist ordering and prefix search (pattern ops let Postgres use it for LIKE 'x%')
+            models.Index(fields=["date", "id"], name="core_item_date_id_idx"),
+            models.Index(fields=["title"], name="core_item_title_prefix_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
+    def to_dict(self, fields=None) -> dict:
+        if fields is not None:
+            return _project(self, fields)
         return {
             "id": self.id,
             "event_id": self.event_id,
             "date": self.date.isoformat(),
             "title": self.title,
-            "time": self.time,
+            "time": format_item_time(self.time),
             "description": self.description,
             "notes": self.notes,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
+
+
+class ArchivedEventItem(TracksLoadedDate, models.Model):
+    """Cold copy of an EventItem older than the archive horizon (see core/archive.py).
+
+    Rows keep the id they had in EventItem so client-side references stay valid.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="archived_items")
+    date = models.DateField()
+    title = models.CharField(max_length=255)
+    time = models.TimeField(null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    notes = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["event", "date", "time"], name="core_archived_event_time_idx")]
+
+
+class YearSnapshot(models.Model):
+    """Precomputed JSON of all items a user has in one closed year (see core/snapshots.py)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="year_snapshots")
+    year = models.PositiveSmallIntegerField()
+    digest = models.CharField(max_length=64)  # sha256 of content; part of the snapshot URL
+    content = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "year"], name="core_snapshot_user_year_uniq")]
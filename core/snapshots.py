@@ -0,0 +1,141 @@
+"""Content-addressed JSON snapshots of a user's items in closed (past) years.
+
+A snapshot holds every item of the user dated in one year, hot and archived, as
+{"year": 2024, "items": [...]}, and is served at /api/snapshots/<year>/<digest>
+where digest is the sha256 of its content. The URL therefore changes whenever the
+content does, and responses can be cached forever. Snapshots are built on demand by
+`year_snapshots()` and deleted when items of their year are written; the next
+request rebuilds them with a new digest.
+
+Saving or deleting a single item (views, admin or any other ORM write) invalidates
+through the model signals below. Bulk writes send no signals (deletes go through
+`bulk_delete()`) and call `invalidate_snapshots()` once themselves. Either way the
+snapshots are deleted once the writing transaction commits, and not at all if it rolls
+back. Archiving items leaves snapshots alone, since their content does not depend on
+the table an item is stored in.
+
+A build first claims its years with placeholder rows holding a random token and
+only fills in rows that still hold it. An invalidation deletes placeholders like
+any snapshot, so a build that read items before a concurrent write cannot store
+what it read; that year is simply built again by the next request.
+"""
+import hashlib
+import json
+import uuid
+from datetime import date
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .archive import archived_items
+from .metrics import record_cache_lookup
+from .models import ArchivedEventItem, Event, EventItem, YearSnapshot
+
+# Digest prefix of rows claimed by a build in progress; never a sha256
+PENDING = "pending-"
+
+
+def closed_years(years: Iterable[int]) -> set:
+    """The years that are over, and can therefore be snapshotted."""
+    current = timezone.localdate().year
+    return {year for year in years if year < current}
+
+
+def _build(user, years: set) -> list:
+    """Unsaved snapshots for `years`, read with one query per item table."""
+    start, end = date(min(years), 1, 1), date(max(years), 12, 31)
+    hot = EventItem.objects.filter(event__user=user, date__gte=start, date__lte=end).order_by("date", "time", "id")
+    by_year = {year: [] for year in years}
+    for item in archived_items(user, start=start, end=end) + list(hot):
+        if item.date.year in by_year:
+            by_year[item.date.year].append(item.to_dict())
+    snapshots = []
+    for year, items in sorted(by_year.items()):
+        content = json.dumps({"year": year, "items": items}, separators=(",", ":"))
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        snapshots.append(YearSnapshot(user=user, year=year, digest=digest, content=content))
+    return snapshots
+
+
+def _build_missing(user, years: set) -> dict:
+    """Build and store the snapshots of `years`; returns year -> digest of those stored."""
+    token = PENDING + uuid.uuid4().hex
+    # Claim every year, taking over rows of builds that failed or are still running
+    YearSnapshot.objects.bulk_create(
+        [YearSnapshot(user=user, year=year, digest=token, content="") for year in years],
+        update_conflicts=True, unique_fields=["user", "year"], update_fields=["digest", "content", "created_at"],
+    )
+    built = _build(user, years)
+    claimed = YearSnapshot.objects.filter(user=user, digest=token)
+    stored = claimed.update(
+        digest=Case(*[When(year=s.year, then=Value(s.digest)) for s in built]),
+        content=Case(*[When(year=s.year, then=Value(s.content)) for s in built]),
+    )
+    digests = {s.year: s.digest for s in built}
+    if stored < len(built):
+        # Items of some years were written meanwhile, or another build took them over
+        kept = set(YearSnapshot.objects.filter(user=user, digest__in=digests.values()).values_list("year", "digest"))
+        digests = {year: digest for year, digest in digests.items() if (year, digest) in kept}
+    return digests
+
+
+def year_snapshots(user, years: Iterable[int]) -> dict:
+    """year -> digest for the closed `years` of user, building the missing snapshots.
+
+    A year whose items change while it is built is left out; clients load it live.
+    """
+    years = closed_years(years)
+    if not years:
+        return {}
+    digests = dict(
+        YearSnapshot.objects.filter(user=user, year__in=years).exclude(digest__startswith=PENDING)
+        .values_list("year", "digest")
+    )
+    missing = years - digests.keys()
+    record_cache_lookup("year_snapshot", hits=len(digests), misses=len(missing))
+    if missing:
+        digests.update(_build_missing(user, missing))
+    return digests
+
+
+def _delete_on_commit(**lookups) -> None:
+    """Delete the snapshots matching lookups once the current transaction commits (at once outside one)."""
+    transaction.on_commit(lambda: YearSnapshot.objects.filter(**lookups).delete())
+
+
+def invalidate_snapshots(user_id: int, years: Optional[Iterable[int]] = None) -> None:
+    """Drop user_id's snapshots of `years` (all of them when None) once the current transaction commits."""
+    if years is None:
+        _delete_on_commit(user_id=user_id)
+        return
+    years = closed_years(years)
+    if years:  # the current and future years are never snapshotted
+        _delete_on_commit(user_id=user_id, year__in=years)
+
+
+def invalidate_event_snapshots(event_id: int, years: Iterable[int]) -> None:
+    """Drop the snapshots of `years` of the user owning event_id once the current transaction commits."""
+    years = closed_years(years)
+    if years:
+        _delete_on_commit(user__events__id=event_id, year__in=years)
+
+
+@receiver(post_save, sender=EventItem)
+@receiver(post_save, sender=ArchivedEventItem)
+@receiver(post_delete, sender=EventItem)
+@receiver(post_delete, sender=ArchivedEventItem)
+def _item_written(sender, instance, **kwargs):
+    years = {instance.date.year}
+    if instance.loaded_date is not None:
+        years.add(instance.loaded_date.year)  # the year the item moved out of
+    invalidate_event_snapshots(instance.event_id, years)
+
+
+@receiver(post_delete, sender=Event)
+def _event_deleted(sender, instance, **kwargs):
+    # Its items' invalidations can no longer find the user once the event row is gone
+    invalidate_snapshots(instance.user_id)
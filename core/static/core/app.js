@@ -34,6 +34,10 @@ function getCsrfToken() {
   return '';
 }
 
+// Only the columns the calendar renders; see ?fields= on /api/events and /api/items
+const EVENT_FIELDS = 'title,color';
+const ITEM_FIELDS = 'event_id,date,title,time,notes';
+
 let state = {
   year: new Date().getFullYear(),
   events: [],
@@ -277,6 +281,7 @@ let yearObserver = null;
 let lastScrollTop = 0;
 let isScrollingDown = true;
 let suppressYearObserver = false;
+let itemsBootstrapped = false; // set once boot() has loaded the initial window
 panelEl.addEventListener('scroll', () => {
   const st = panelEl.scrollTop;
   isScrollingDown = st > lastScrollTop;
@@ -493,6 +498,12 @@ function ensureYearRendered(year, _unusedPrepend = false) {
     topObserver.observe(section);
     yearObserver.observe(section);
   }
+  // Years scrolled into view after boot fetch their own window for the active events
+  if (itemsBootstrapped) {
+    loadItemsForEvents(activeEventIds(), `${year}-01-01`, `${year}-12-31`)
+      .then(() => { paintCalendarSelections(); renderItemsPanel(); })
+      .catch(() => {});
+  }
 }
 
 function buildYearSection(year) {
@@ -695,25 +706,64 @@ function paintCalendarSelections() {
 }
 
 function getCachedItemsForDate(dateStr) { return state.itemsCache.get(dateStr) || []; }
-async function loadItemsForDate(dateStr) { const items = await api.get(`/api/items?date=${encodeURIComponent(dateStr)}`); state.itemsCache.set(dateStr, items); }
+async function loadItemsForDate(dateStr) { const items = await api.get(`/api/items?date=${encodeURIComponent(dateStr)}&fields=${ITEM_FIELDS}`); state.itemsCache.set(dateStr, items); }
 
-async function loadItemsForEvent(eventId) {
-  const items = await api.get(`/api/items?event_id=${encodeURIComponent(eventId)}`);
-  const byDate = new Map();
-  for (const it of items) {
-    if (!byDate.has(it.date)) byDate.set(it.date, []);
-    byDate.get(it.date).push(it);
+// Date window covered by the rendered year sections
+function renderedRange() {
+  return [`${minRenderedYear}-01-01`, `${maxRenderedYear}-12-31`];
+}
+
+// Past years are served as immutable snapshots the browser keeps; see /api/snapshots
+const MAX_SNAPSHOT_YEARS = 50;
+
+// Snapshot URLs of the past whole years at the start of [start, end], keyed by year
+async function snapshotUrls(start, end) {
+  const years = [];
+  const currentYear = new Date().getFullYear();
+  if (start.endsWith('-01-01')) {
+    for (let y = Number(start.slice(0, 4)); y < currentYear && `${y}-12-31` <= end; y++) years.push(y);
   }
+  if (years.length === 0 || years.length > MAX_SNAPSHOT_YEARS) return {};
+  return api.get(`/api/snapshots?years=${years.join(',')}`);
+}
+
+// Load items of several events within [start, end]: past years from snapshots, the rest with a single request
+async function loadItemsForEvents(eventIds, start, end) {
+  const ids = [...new Set(eventIds)].filter(id => id != null);
+  if (ids.length === 0) return;
+  const idSet = new Set(ids);
+  const urls = await snapshotUrls(start, end);
+  // The server only snapshots years that are over; whatever follows is loaded live
+  let liveYear = Number(start.slice(0, 4));
+  while (urls[liveYear]) liveYear++;
+  const liveStart = liveYear === Number(start.slice(0, 4)) ? start : `${liveYear}-01-01`;
+  const params = `event_ids=${ids.join(',')}&start=${liveStart}&end=${end}&fields=${ITEM_FIELDS}`;
+  const [snapshots, grouped] = await Promise.all([
+    Promise.all(Object.values(urls).map(url => api.get(url))),
+    liveStart <= end ? api.get(`/api/items?${params}`) : {},
+  ]);
   for (const [dateStr, entry] of state.itemsCache.entries()) {
-    const kept = entry.filter(x => x.event_id !== eventId);
-    state.itemsCache.set(dateStr, kept);
+    if (dateStr < start || dateStr > end) continue;
+    state.itemsCache.set(dateStr, entry.filter(x => !idSet.has(x.event_id)));
   }
-  for (const [dateStr, eventItems] of byDate.entries()) {
-    const existing = state.itemsCache.get(dateStr) || [];
-    state.itemsCache.set(dateStr, [...existing, ...eventItems]);
+  const snapshotItems = snapshots.flatMap(s => s.items).filter(it => idSet.has(it.event_id));
+  for (const eventItems of [snapshotItems, ...Object.values(grouped)]) {
+    for (const it of eventItems) {
+      if (!state.itemsCache.has(it.date)) state.itemsCache.set(it.date, []);
+      state.itemsCache.get(it.date).push(it);
+    }
   }
 }
 
+async function loadItemsForEvent(eventId) {
+  await loadItemsForEvents([eventId], ...renderedRange());
+}
+
+// Events whose items are painted: highlighted ones plus the draw event
+function activeEventIds() {
+  return [...state.highlightEventIds, state.drawEventId];
+}
+
 // debounce token to avoid race conditions
 let highlightToken = 0;
 
@@ -728,7 +778,7 @@ async function toggleEventHighlight(eventId) {
   saveHighlightState();
   renderSelectedEventThumbs();
   // Ensure items are loaded before painting to avoid multi-click jitter
-  await loadItemsForEvent(eventId);
+  if (state.highlightEventIds.has(eventId)) await loadItemsForEvent(eventId);
   if (token !== highlightToken) return; // a newer toggle occurred, abort
   paintCalendarSelections();
 
@@ -2008,7 +2058,7 @@ if (prevYearBtn) prevYearBtn.addEventListener('click', () => { state.year -= 1;
 if (nextYearBtn) nextYearBtn.addEventListener('click', () => { state.year += 1; ensureYearRendered(state.year); scrollToYear(state.year); });
 
 async function refreshEvents() {
-  const response = await api.get('/api/events');
+  const response = await api.get(`/api/events?fields=${EVENT_FIELDS}`);
   state.events = response;
 
   // Apply saved order if present; otherwise save current order as baseline
@@ -2096,6 +2146,57 @@ function setupSidebarCollapse() {
   });
 }
 
+// Live updates from other tabs/devices via /api/stream (server-sent events).
+// Changes are batched briefly so a paint burst elsewhere costs one refresh here.
+let pendingRemoteChanges = [];
+let remoteChangeTimer = null;
+
+function connectChangeStream() {
+  if (!window.EventSource) return;
+  // A non-200 answer (e.g. 501 when not served over ASGI) closes the source for good
+  const source = new EventSource('/api/stream');
+  source.addEventListener('change', (e) => {
+    pendingRemoteChanges.push(JSON.parse(e.data));
+    clearTimeout(remoteChangeTimer);
+    remoteChangeTimer = setTimeout(applyRemoteChanges, 150);
+  });
+}
+
+async function applyRemoteChanges() {
+  const changes = pendingRemoteChanges;
+  pendingRemoteChanges = [];
+  const dates = new Set();
+  const reloadEventIds = new Set();
+  let reloadEvents = false;
+  let resync = false;
+  for (const c of changes) {
+    if (c.kind === 'item') {
+      dates.add(c.date);
+      if (c.previous_date) dates.add(c.previous_date);
+    } else if (c.kind === 'event') {
+      reloadEvents = true;
+      if (c.op === 'items') reloadEventIds.add(c.id);
+    } else {
+      resync = true;
+    }
+  }
+  try {
+    if (reloadEvents || resync) await refreshEvents();
+    if (resync) {
+      await loadItemsForEvents(activeEventIds(), ...renderedRange());
+      if (state.dayItemsDate) dates.add(state.dayItemsDate);
+    } else if (reloadEventIds.size > 0) {
+      await loadItemsForEvents([...reloadEventIds], ...renderedRange());
+    }
+    for (const d of dates) {
+      if (state.itemsCache.has(d) || d === state.dayItemsDate) await loadItemsForDate(d);
+    }
+  } catch { return; }
+  paintCalendarSelections();
+  renderItemsPanel();
+  if (state.dayItemsDate) renderDayItemsPanel();
+}
+
 async function boot() {
   setupItemsCollapse();
   setupSidebarCollapse();
@@ -2108,12 +2209,11 @@ async function boot() {
   // Scroll to today on initial load
   scrollToDate(todayStr);
 
-  // Load items for highlighted events (including preselected ones)
-  for (const id of state.highlightEventIds) {
-    try {
-      await loadItemsForEvent(id);
-    } catch {}
-  }
+  // Load items for highlighted events (including preselected ones) in one request
+  try {
+    await loadItemsForEvents(activeEventIds(), ...renderedRange());
+  } catch {}
+  itemsBootstrapped = true;
 
   highlightViewingEvent();
   paintCalendarSelections();
@@ -2122,6 +2222,7 @@ async function boot() {
   state.dayItemsDate = todayStr;
   await loadItemsForDate(todayStr);
   renderDayItemsPanel();
+  connectChangeStream();
 }
 boot();
 
@@ -0,0 +1,143 @@
+"""Aggregated per-event statistics, computed in the database and cached per event version.
+
+The cache key includes a version number per event, kept in the cache itself. Saving or
+deleting an item bumps it through the model signals below, whatever wrote the item
+(views, admin or shell); bulk writes, which send no signals, call `mark_items_changed()`.
+Versions are bumped once the write commits, so every worker process drops the cached
+stats at the same time and the Event row is never rewritten.
+"""
+import time
+from datetime import date, timedelta
+from typing import Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import ExtractIsoWeekDay, Lag, Lead, TruncMonth
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .metrics import record_cache_lookup
+from .models import ArchivedEventItem, Event, EventItem
+
+ONE_DAY = timedelta(days=1)
+
+
+def _version_key(event_id: int) -> str:
+    return f"event-stats-ver:{event_id}"
+
+
+def _bump_versions(event_ids: set) -> None:
+    for event_id in event_ids:
+        try:
+            cache.incr(_version_key(event_id))
+        except ValueError:
+            # No version stored (never read, or evicted): start one no cached stats are keyed on
+            cache.set(_version_key(event_id), time.time_ns(), None)
+
+
+def mark_items_changed(event_ids: Iterable[int]) -> None:
+    """Drop the cached stats of the given events once the current transaction commits."""
+    event_ids = set(event_ids)
+    if event_ids:
+        transaction.on_commit(lambda: _bump_versions(event_ids))
+
+
+@receiver(post_save, sender=EventItem)
+@receiver(post_save, sender=ArchivedEventItem)
+@receiver(post_delete, sender=EventItem)
+@receiver(post_delete, sender=ArchivedEventItem)
+def _item_written(sender, instance, **kwargs):
+    mark_items_changed([instance.event_id])
+
+
+def _streak_bounds(qs) -> list:
+    """(start, end) of every run of consecutive dates in qs, found with LAG/LEAD in one query.
+
+    Only rows on a run boundary leave the database; duplicate dates are harmless because
+    only the first row of a date can start a run and only the last can end one.
+    """
+    rows = (
+        qs.annotate(
+            prev=Window(Lag("date"), order_by=F("date").asc()),
+            next=Window(Lead("date"), order_by=F("date").asc()),
+        )
+        .filter(
+            Q(prev__isnull=True) | Q(prev__lt=F("date") - ONE_DAY)
+            | Q(next__isnull=True) | Q(next__gt=F("date") + ONE_DAY)
+        )
+        .order_by("date")
+        .values_list("date", "prev", "next")
+    )
+    starts, ends = [], []
+    for day, prev, nxt in rows:
+        if prev is None or prev < day - ONE_DAY:
+            starts.append(day)
+        if nxt is None or nxt > day + ONE_DAY:
+            ends.append(day)
+    return list(zip(starts, ends))
+
+
+def _merge_bounds(bounds: list) -> list:
+    """Merge overlapping or adjacent runs coming from the hot and archive tables."""
+    merged = []
+    for start, end in sorted(bounds):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def compute_event_stats(event: Event, today: date) -> dict:
+    """Run the aggregation queries (three per item table) and assemble the stats payload."""
+    by_month, by_weekday, bounds = {}, [0] * 7, []
+    for model in (EventItem, ArchivedEventItem):
+        qs = model.objects.filter(event=event)
+        months = qs.annotate(month=TruncMonth("date")).values("month").annotate(n=Count("id")).order_by()
+        for row in months:
+            key = row["month"].strftime("%Y-%m")
+            by_month[key] = by_month.get(key, 0) + row["n"]
+        weekdays = qs.annotate(weekday=ExtractIsoWeekDay("date")).values("weekday").annotate(n=Count("id")).order_by()
+        for row in weekdays:
+            by_weekday[row["weekday"] - 1] += row["n"]
+        bounds.extend(_streak_bounds(qs))
+
+    runs = _merge_bounds(bounds)
+    longest = max(runs, key=lambda r: (r[1] - r[0], r[0]), default=None)
+    # A run still counts as current until the end of the day after its last item
+    current = next((r for r in runs if r[0] <= today and r[1] >= today - ONE_DAY), None)
+    current_length = (min(current[1], today) - current[0]).days + 1 if current else 0
+
+    return {
+        "event_id": event.id,
+        "total": sum(by_month.values()),
+        "first_date": runs[0][0].isoformat() if runs else None,
+        "last_date": runs[-1][1].isoformat() if runs else None,
+        "by_month": [{"month": month, "count": by_month[month]} for month in sorted(by_month)],
+        "by_weekday": [
+            {"weekday": name, "count": count}
+            for name, count in zip(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"), by_weekday)
+        ],
+        "longest_streak": {
+            "length": (longest[1] - longest[0]).days + 1,
+            "start": longest[0].isoformat(),
+            "end": longest[1].isoformat(),
+        } if longest else {"length": 0, "start": None, "end": None},
+        "current_streak": current_length,
+    }
+
+
+def event_stats(event: Event) -> dict:
+    """Stats for `event`, served from cache until one of its items changes."""
+    today = timezone.localdate()
+    version = cache.get_or_set(_version_key(event.id), time.time_ns, None)
+    key = f"event-stats:{event.id}:{version}:{today.isoformat()}"
+    stats = cache.get(key)
+    record_cache_lookup("event_stats", hits=stats is not None, misses=stats is None)
+    if stats is None:
+        stats = compute_event_stats(event, today)
+        # The key rolls over daily anyway (current streak depends on today)
+        cache.set(key, stats, 24 * 60 * 60)
+    return stats
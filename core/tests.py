@@ -0,0 +1,1046 @@
+import asyncio
+import gzip
+import json
+import struct
+from datetime import date, time, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
+
+from .admin import EstimatedCountPaginator, estimated_row_count
+from .archive import ITEM_COLUMNS, archive_cutoff, archive_old_items
+from . import broadcast
+from .backup import EVENT, MAX_RECORD_SIZE, _records, compress, encode_event, encode_item
+from .dedupe import add_unique_index, drop_unique_index, merge_duplicates
+from .models import ArchivedEventItem, Event, EventItem
+from .stats import compute_event_stats
+
+
+# Session and user caching as enabled by AUTH_CACHE (see colendar_site/settings.py)
+AUTH_CACHE_SETTINGS = dict(
+    AUTH_CACHE="locmem",
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    SESSION_CACHE_ALIAS="auth",
+)
+
+
+@override_settings(**AUTH_CACHE_SETTINGS)
+class QueryBudgetTests(TestCase):
+    """Every endpoint runs a fixed number of queries, whatever the amount of data.
+
+    Each test issues the same request as a user with little data and as a user with a
+    lot of it, and both must stay within the same budget. A budget that has to grow
+    with SIZES means an N+1 crept in. Sessions and users come from the auth cache, so
+    the counts are the views' own queries. Bulk statements are still split by the
+    backend's parameter limit (999 on SQLite), so the large data set stays below one batch.
+    """
+
+    # (events, items per event); each event also gets as many archived items
+    SIZES = ((2, 2), (6, 30))
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.accounts = []
+        for event_count, size in cls.SIZES:
+            user = User.objects.create_user(f"user{size}", f"user{size}@example.com", "pw")
+            events = []
+            for e in range(event_count):
+                event = Event.objects.create(user=user, title=f"Event {e} - 2025-08-12", color="#3B82F6")
+                EventItem.objects.bulk_create(
+                    [EventItem(event=event, date=today - timedelta(days=i), title=f"Item {i} - 2025-08-12",
+                               time=time(9, 0), notes="n") for i in range(size)]
+                    + [EventItem(event=event, date=date(2015, 1, 1) + timedelta(days=i), title=f"Old {i}")
+                       for i in range(size)]
+                )
+                events.append(event)
+            # Double-clicked copies for the dedupe endpoint
+            EventItem.objects.bulk_create([
+                EventItem(event=events[0], date=today - timedelta(days=i), title=f"Item {i} - 2025-08-12", notes="copy")
+                for i in range(size)
+            ])
+            first_item = EventItem.objects.filter(event=events[0], date__gte=today - timedelta(days=size)).first()
+            cls.accounts.append(SimpleNamespace(size=size, user=user, events=events, item_id=first_item.id))
+        archive_old_items()
+
+    def setUp(self):
+        cache.clear()
+        caches["auth"].clear()
+
+    def assertBudget(self, budget, request):
+        """Run request(client, account) for every data size within `budget` queries."""
+        for account in self.accounts:
+            with self.subTest(size=account.size):
+                self.client.force_login(account.user)
+                with self.assertNumQueries(budget), self.captureOnCommitCallbacks(execute=True):
+                    response = request(self.client, account)
+                self.assertLess(response.status_code, 400, None if response.streaming else response.content[:200])
+
+    # Pages
+
+    def test_index(self):
+        self.assertBudget(1, lambda c, a: c.get("/"))
+
+    def test_settings_page(self):
+        self.assertBudget(0, lambda c, a: c.get("/settings/"))
+
+    def test_event_detail_page(self):
+        self.assertBudget(3, lambda c, a: c.get(f"/events/{a.events[0].id}/"))
+
+    # Events API
+
+    def test_events_list(self):
+        self.assertBudget(2, lambda c, a: c.get("/api/events"))
+
+    def test_events_list_projected(self):
+        self.assertBudget(1, lambda c, a: c.get("/api/events?fields=title,color"))
+
+    def test_event_patch(self):
+        self.assertBudget(2, lambda c, a: c.patch(
+            f"/api/events/{a.events[0].id}", json.dumps({"title": "Renamed"}), content_type="application/json"))
+
+    def test_event_clone(self):
+        self.assertBudget(8, lambda c, a: c.post(
+            f"/api/events/{a.events[0].id}/clone", json.dumps({"days": 7}), content_type="application/json"))
+
+    def test_event_shift(self):
+        self.assertBudget(13, lambda c, a: c.post(
+            f"/api/events/{a.events[0].id}/shift", json.dumps({"start": "2016-01-01"}),
+            content_type="application/json"))
+
+    def test_event_stats(self):
+        self.assertBudget(7, lambda c, a: c.get(f"/api/events/{a.events[0].id}/stats"))
+
+    # Items API
+
+    def test_items_all(self):
+        self.assertBudget(2, lambda c, a: c.get("/api/items"))
+
+    def test_items_by_event(self):
+        self.assertBudget(2, lambda c, a: c.get(f"/api/items?event_id={a.events[0].id}"))
+
+    def test_items_by_date(self):
+        self.assertBudget(1, lambda c, a: c.get(f"/api/items?date={date.today().isoformat()}"))
+
+    def test_items_by_archived_date(self):
+        self.assertBudget(2, lambda c, a: c.get("/api/items?date=2015-01-01"))
+
+    def test_items_by_time_range(self):
+        self.assertBudget(2, lambda c, a: c.get("/api/items?start_time=08:00&end_time=10:00"))
+
+    def test_items_by_events_window(self):
+        def request(c, a):
+            ids = ",".join(str(e.id) for e in a.events)
+            start, end = date.today() - timedelta(days=365), date.today()
+            return c.get(f"/api/items?event_ids={ids}&start={start}&end={end}&fields=event_id,date")
+        self.assertBudget(1, request)
+
+    def test_item_create(self):
+        # Includes the savepoint pair around the insert
+        self.assertBudget(5, lambda c, a: c.post(
+            "/api/items", json.dumps({"event_id": a.events[0].id, "date": "2025-08-12", "title": "New"}),
+            content_type="application/json"))
+
+    def test_item_patch(self):
+        # Includes the savepoint pair around the update
+        self.assertBudget(4, lambda c, a: c.patch(
+            f"/api/items/{a.item_id}", json.dumps({"title": "Edited"}),
+            content_type="application/json"))
+
+    def test_item_delete(self):
+        self.assertBudget(2, lambda c, a: c.delete(f"/api/items/{a.item_id}"))
+
+    def test_snapshot_index(self):
+        # First request builds the snapshots, the second only reads their digests
+        self.assertBudget(5, lambda c, a: c.get("/api/snapshots?years=2015,2016,2024"))
+        self.assertBudget(1, lambda c, a: c.get("/api/snapshots?years=2015,2016,2024"))
+
+    def test_year_snapshot(self):
+        def request(c, a):
+            url = c.get("/api/snapshots?years=2015").json()["2015"]
+            with self.assertNumQueries(1):
+                return c.get(url)
+        for account in self.accounts:
+            self.client.force_login(account.user)
+            self.assertLess(request(self.client, account).status_code, 400)
+
+    # Export / import / maintenance
+
+    def test_export_event(self):
+        self.assertBudget(3, lambda c, a: c.get(f"/api/export/event/{a.events[0].id}"))
+
+    def test_import_data(self):
+        def request(c, a):
+            payload = {
+                "event": {"title": a.events[0].title},
+                "items": [{"title": f"Imported {i}", "date": "2024-03-01"} for i in range(a.size)],
+            }
+            return c.post("/api/import", json.dumps({"data": json.dumps(payload)}), content_type="application/json")
+        self.assertBudget(6, request)
+
+    def test_backup_account(self):
+        def request(c, a):
+            response = c.get("/api/backup")
+            b"".join(response.streaming_content)  # the queries run while the body streams
+            return response
+        self.assertBudget(2, request)
+
+    def test_restore_account(self):
+        def request(c, a):
+            # a.size items in total keep the insert within one batch
+            now = a.events[0].created_at
+            records = [encode_event(e.id, now, now, e.title, e.color) for e in a.events] + [
+                encode_item(a.events[i % len(a.events)].id, date(2024, 3, 1), now, now, f"Restored {i}", None, None, "")
+                for i in range(a.size)
+            ]
+            backup = b"".join(compress(records))
+            return c.post("/api/restore?mode=replace", backup, content_type="application/octet-stream")
+        self.assertBudget(8, request)
+
+    def test_strip_item_title_dates(self):
+        self.assertBudget(2, lambda c, a: c.post("/api/maintenance/strip-item-title-dates"))
+
+    def test_dedupe_items_report(self):
+        self.assertBudget(2, lambda c, a: c.get("/api/maintenance/dedupe-items"))
+
+    def test_dedupe_items_merge(self):
+        self.assertBudget(9, lambda c, a: c.post("/api/maintenance/dedupe-items"))
+
+
+class GroupedItemsTests(TestCase):
+    """GET /api/items?event_ids= returns one list per requested id, limited to the user's events."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("ana", "ana@example.com", "pw")
+        self.client.force_login(self.user)
+        self.run = Event.objects.create(user=self.user, title="Run", color="#3B82F6")
+        self.read = Event.objects.create(user=self.user, title="Read", color="#10B981")
+        self.empty = Event.objects.create(user=self.user, title="Empty", color="#F59E0B")
+        other = User.objects.create_user("bo", "bo@example.com", "pw")
+        self.foreign = Event.objects.create(user=other, title="Secret", color="#EF4444")
+        EventItem.objects.create(event=self.foreign, date=archive_cutoff(), title="Hidden")
+        self.cutoff = archive_cutoff()
+        EventItem.objects.create(event=self.run, date=self.cutoff - timedelta(days=40), title="Archived run")
+        EventItem.objects.create(event=self.run, date=self.cutoff + timedelta(days=60), title="Run")
+        EventItem.objects.create(event=self.run, date=self.cutoff + timedelta(days=200), title="Late run")
+        EventItem.objects.create(event=self.read, date=self.cutoff + timedelta(days=61), title="Read")
+        self.assertEqual(archive_old_items(), 1)
+
+    def get(self, ids, **params):
+        query = "&".join([f"event_ids={','.join(map(str, ids))}"] + [f"{k}={v}" for k, v in params.items()])
+        return self.client.get(f"/api/items?{query}")
+
+    def test_every_requested_id_is_present(self):
+        ids = [self.run.id, self.read.id, self.empty.id, self.foreign.id]
+        grouped = self.get(ids, fields="event_id,date,title").json()
+        self.assertEqual(list(grouped), [str(i) for i in ids])
+        self.assertEqual(grouped[str(self.empty.id)], [])
+        self.assertEqual(grouped[str(self.foreign.id)], [])
+        self.assertCountEqual([i["title"] for i in grouped[str(self.run.id)]], ["Archived run", "Run", "Late run"])
+        self.assertEqual(grouped[str(self.read.id)],
+                         [{"id": grouped[str(self.read.id)][0]["id"], "event_id": self.read.id,
+                           "date": str(self.cutoff + timedelta(days=61)), "title": "Read"}])
+
+    def test_date_window_spans_archive(self):
+        start, end = self.cutoff - timedelta(days=40), self.cutoff + timedelta(days=60)
+        grouped = self.get([self.run.id, self.read.id], start=start, end=end).json()
+        self.assertCountEqual([i["title"] for i in grouped[str(self.run.id)]], ["Archived run", "Run"])
+        self.assertEqual(grouped[str(self.read.id)], [])
+
+    def test_grouping_key_is_loaded_but_not_returned(self):
+        grouped = self.get([self.read.id], fields="title").json()
+        self.assertEqual([sorted(i) for i in grouped[str(self.read.id)]], [["id", "title"]])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get("/api/items?event_ids=1,x").status_code, 400)
+        self.assertEqual(self.get([self.run.id], start="2024-13-01").status_code, 422)
+
+
+class FieldProjectionTests(TestCase):
+    """?fields= on the events and items APIs returns the id plus exactly the requested keys."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("cy", "cy@example.com", "pw")
+        self.client.force_login(self.user)
+        self.event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+        self.item = EventItem.objects.create(event=self.event, date=date.today(), title="Legs",
+                                             time=time(7, 30), notes="heavy")
+
+    def test_only_requested_keys_are_serialized(self):
+        events = self.client.get("/api/events?fields=title,color").json()
+        self.assertEqual(events, [{"id": self.event.id, "title": "Gym", "color": "#3B82F6"}])
+        items = self.client.get(f"/api/items?date={date.today()}&fields=title,time").json()
+        self.assertEqual(items, [{"id": self.item.id, "title": "Legs", "time": "07:30"}])
+
+    def test_id_is_always_returned(self):
+        events = self.client.get("/api/events?fields=color").json()
+        self.assertEqual(events, [{"id": self.event.id, "color": "#3B82F6"}])
+        # Asking for it explicitly, or twice, changes nothing
+        items = self.client.get(f"/api/items?event_id={self.event.id}&fields=id,notes,id").json()
+        self.assertEqual(items, [{"id": self.item.id, "notes": "heavy"}])
+
+    def test_unknown_keys_are_rejected(self):
+        response = self.client.get("/api/events?fields=title,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", response.json()["error"])
+        self.assertEqual(self.client.get("/api/items?fields=items").status_code, 400)
+        self.assertEqual(self.client.get("/api/items?event_ids=1&fields=user").status_code, 400)
+
+    def test_items_key_embeds_full_items(self):
+        events = self.client.get("/api/events?fields=items").json()
+        self.assertEqual(events, [{"id": self.event.id, "items": [self.item.to_dict()]}])
+        without = self.client.get("/api/events?fields=title").json()
+        self.assertNotIn("items", without[0])
+
+    def test_without_fields_the_full_shape_is_returned(self):
+        self.assertEqual(self.client.get("/api/events").json(), [self.event.to_dict()])
+        self.assertEqual(self.client.get("/api/items?fields=").json(), [self.item.to_dict()])
+
+
+class BroadcastTests(TestCase):
+    """Change notifications reach only the writer's connections, and only once the write commits."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("max", "max@example.com", "pw")
+        self.other = User.objects.create_user("nia", "nia@example.com", "pw")
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, user):
+        async def subscribe():
+            return broadcast.broadcaster.subscribe(user.id)
+        queue = self.loop.run_until_complete(subscribe())
+        self.addCleanup(broadcast.broadcaster.unsubscribe, user.id, queue)
+        return queue
+
+    def drain(self, queue):
+        self.loop.run_until_complete(asyncio.sleep(0))  # run the queued call_soon_threadsafe callbacks
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
+
+    def test_published_after_commit_to_the_writer_only(self):
+        mine, theirs = self.subscribe(self.user), self.subscribe(self.other)
+        with self.captureOnCommitCallbacks() as callbacks:
+            broadcast.notify_change(self.user.id, "item", 7, "update", event_id=3)
+            self.assertEqual(self.drain(mine), [])  # not before the transaction commits
+        for callback in callbacks:
+            callback()
+        [message] = self.drain(mine)
+        self.assertEqual({k: message[k] for k in ("kind", "id", "op", "event_id")},
+                         {"kind": "item", "id": 7, "op": "update", "event_id": 3})
+        self.assertEqual(self.drain(theirs), [])
+
+    def test_rolled_back_write_is_not_published(self):
+        mine = self.subscribe(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    broadcast.notify_change(self.user.id, "item", 7, "delete")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.drain(mine), [])
+
+    def test_api_write_notifies(self):
+        mine = self.subscribe(self.user)
+        event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/items", json.dumps({"event_id": event.id, "date": "2025-08-12", "title": "Run"}),
+                             content_type="application/json")
+        [message] = self.drain(mine)
+        self.assertEqual((message["kind"], message["op"], message["date"]), ("item", "create", "2025-08-12"))
+
+    def test_orm_writes_notify(self):
+        mine = self.subscribe(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+            item = EventItem.objects.create(event=event, date=date(2025, 8, 12), title="Run")
+        item = EventItem.objects.get(id=item.id)  # as the admin loads it, without the event
+        with self.captureOnCommitCallbacks(execute=True):
+            item.date = date(2025, 8, 13)
+            item.save()
+            item.delete()
+            event.delete()
+        messages = self.drain(mine)
+        self.assertEqual([(m["kind"], m["op"]) for m in messages],
+                         [("event", "create"), ("item", "create"), ("item", "update"), ("item", "delete"),
+                          ("event", "delete")])
+        self.assertEqual((messages[2]["date"], messages[2]["previous_date"]), ("2025-08-13", "2025-08-12"))
+        self.assertNotIn("previous_date", messages[3])
+
+    def test_rolled_back_orm_write_is_not_published(self):
+        mine = self.subscribe(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.drain(mine), [])
+
+    def test_dedupe_command_notifies(self):
+        mine = self.subscribe(self.user)
+        event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+        for _ in range(2):
+            EventItem.objects.create(event=event, date=date(2025, 8, 12), title="Run")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_items", stdout=StringIO())
+        [message] = self.drain(mine)
+        self.assertEqual((message["kind"], message["id"], message["op"]), ("event", event.id, "items"))
+
+    def test_full_queue_is_replaced_by_resync(self):
+        with patch.object(broadcast, "QUEUE_SIZE", 2):
+            mine = self.subscribe(self.user)
+        for i in range(3):
+            broadcast.broadcaster.publish(self.user.id, {"kind": "item", "id": i, "op": "update"})
+        messages = self.drain(mine)
+        self.assertEqual([(m["kind"], m["op"]) for m in messages], [("all", "resync")])
+
+    def test_stream_needs_asgi(self):
+        self.assertEqual(self.client.get("/api/stream").status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/api/stream").status_code, 501)
+
+
+class ArchiveTests(TestCase):
+    """Archived items stay visible through the API and come back when edited."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("kim", "kim@example.com", "pw")
+        self.client.force_login(self.user)
+        self.event = Event.objects.create(user=self.user, title="Diary", color="#3B82F6")
+        self.old_day = archive_cutoff() - timedelta(days=40)
+        self.old = EventItem.objects.create(event=self.event, date=self.old_day, title="Old", notes="kept")
+        self.new = EventItem.objects.create(event=self.event, date=archive_cutoff(), title="New")
+        self.assertEqual(archive_old_items(), 1)
+
+    def test_items_by_date_and_event_include_archived(self):
+        response = self.client.get(f"/api/items?date={self.old_day}")
+        self.assertEqual([(i["id"], i["notes"]) for i in response.json()], [(self.old.id, "kept")])
+        response = self.client.get(f"/api/items?event_id={self.event.id}")
+        self.assertEqual([i["title"] for i in response.json()], ["Old", "New"])  # in date order
+
+    def test_export_includes_archived(self):
+        export = json.loads(self.client.get(f"/api/export/event/{self.event.id}").json()["export_text"])
+        self.assertEqual([i["title"] for i in export["items"]], ["Old", "New"])
+
+    def test_patch_restores_archived_item(self):
+        response = self.client.patch(f"/api/items/{self.old.id}", json.dumps({"title": "Old, edited"}),
+                                     content_type="application/json")
+        self.assertEqual(response.json()["id"], self.old.id)
+        self.assertFalse(ArchivedEventItem.objects.exists())
+        item = EventItem.objects.get(id=self.old.id)
+        self.assertEqual((item.title, item.notes, item.date), ("Old, edited", "kept", self.old_day))
+
+    def test_delete_removes_archived_item(self):
+        self.assertEqual(self.client.delete(f"/api/items/{self.old.id}").status_code, 204)
+        self.assertFalse(ArchivedEventItem.objects.exists())
+        self.assertFalse(EventItem.objects.filter(id=self.old.id).exists())
+
+    def test_other_users_archived_items_are_hidden(self):
+        self.client.force_login(User.objects.create_user("lee", "lee@example.com", "pw"))
+        self.assertEqual(self.client.get(f"/api/items?date={self.old_day}").json(), [])
+        self.assertEqual(self.client.delete(f"/api/items/{self.old.id}").status_code, 404)
+        self.assertTrue(ArchivedEventItem.objects.filter(id=self.old.id).exists())
+
+
+class EventStatsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("jack", "jack@example.com", "pw")
+        self.event = Event.objects.create(user=user, title="Run", color="#3B82F6")
+        now = self.event.created_at
+        # One streak across the archive boundary, with a duplicated day, then a shorter one
+        ArchivedEventItem.objects.bulk_create([
+            ArchivedEventItem(id=1000 + i, event=self.event, date=day, title="Run", created_at=now, updated_at=now)
+            for i, day in enumerate([date(2024, 12, 30), date(2024, 12, 31)])
+        ])
+        EventItem.objects.bulk_create([
+            EventItem(event=self.event, date=day, title="Run")
+            for day in [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 2), date(2025, 1, 5), date(2025, 1, 6)]
+        ])
+
+    def test_counts_and_streaks(self):
+        stats = compute_event_stats(self.event, today=date(2025, 3, 1))
+        self.assertEqual(stats["total"], 7)
+        self.assertEqual((stats["first_date"], stats["last_date"]), ("2024-12-30", "2025-01-06"))
+        self.assertEqual(stats["by_month"], [{"month": "2024-12", "count": 2}, {"month": "2025-01", "count": 5}])
+        self.assertEqual([d["count"] for d in stats["by_weekday"]], [2, 1, 1, 2, 0, 0, 1])
+        self.assertEqual(stats["longest_streak"], {"length": 4, "start": "2024-12-30", "end": "2025-01-02"})
+        self.assertEqual(stats["current_streak"], 0)
+
+    def test_current_streak(self):
+        for today, expected in (
+            (date(2025, 1, 6), 2),  # item today
+            (date(2025, 1, 7), 2),  # last item yesterday still counts
+            (date(2025, 1, 8), 0),
+            (date(2025, 1, 1), 3),  # only days up to today count
+            (date(2025, 1, 4), 0),
+        ):
+            with self.subTest(today=today):
+                self.assertEqual(compute_event_stats(self.event, today)["current_streak"], expected)
+
+    def test_event_without_items(self):
+        empty = Event.objects.create(user=self.event.user, title="Empty", color="#3B82F6")
+        stats = compute_event_stats(empty, today=date(2025, 1, 1))
+        self.assertEqual((stats["total"], stats["first_date"], stats["current_streak"]), (0, None, 0))
+        self.assertEqual(stats["longest_streak"], {"length": 0, "start": None, "end": None})
+
+    def test_cached_stats_follow_any_item_write(self):
+        cache.clear()
+        self.client.force_login(self.event.user)
+        url = f"/api/events/{self.event.id}/stats"
+        updated_at = self.event.updated_at
+        self.assertEqual(self.client.get(url).json()["total"], 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            # Like the admin's delete_selected: a queryset delete outside the views
+            EventItem.objects.filter(event=self.event).delete()
+        self.assertEqual(self.client.get(url).json()["total"], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchivedEventItem.objects.filter(event=self.event).first().delete()
+        self.assertEqual(self.client.get(url).json()["total"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            EventItem.objects.create(event=self.event, date=date(2025, 2, 1), title="Run")
+        self.assertEqual(self.client.get(url).json()["total"], 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.updated_at, updated_at)
+
+    def test_rolled_back_write_keeps_cached_stats(self):
+        cache.clear()
+        self.client.force_login(self.event.user)
+        url = f"/api/events/{self.event.id}/stats"
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                EventItem.objects.create(event=self.event, date=date(2025, 2, 1), title="Run")
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        with patch("core.stats.compute_event_stats") as compute:
+            self.assertEqual(self.client.get(url).json()["total"], 7)
+        compute.assert_not_called()
+
+
+class EventCloneShiftTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ivy", "ivy@example.com", "pw")
+        self.client.force_login(self.user)
+        self.event = Event.objects.create(user=self.user, title="Garden", color="#10B981")
+        cutoff = archive_cutoff()
+        self.old_day = cutoff - timedelta(days=3)  # archived
+        self.days = [cutoff + timedelta(days=10), cutoff + timedelta(days=11)]
+        EventItem.objects.bulk_create(
+            [EventItem(event=self.event, date=self.old_day, title="Seed", notes="n", time=time(8, 0))]
+            + [EventItem(event=self.event, date=day, title="Water") for day in self.days]
+        )
+        archive_old_items()
+
+    def post(self, action, body, event=None):
+        return self.client.post(f"/api/events/{(event or self.event).id}/{action}", json.dumps(body),
+                                content_type="application/json")
+
+    def dates(self, event, model=EventItem):
+        return sorted(model.objects.filter(event=event).values_list("date", flat=True))
+
+    def test_clone_copies_hot_and_archived_items(self):
+        response = self.post("clone", {"days": 7, "title": "Garden 2"})
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["items_created"], 3)
+        clone = Event.objects.get(id=body["event"]["id"])
+        self.assertEqual((clone.title, clone.color), ("Garden 2", "#10B981"))
+        # Copies go into the hot table, moved by a week, with their fields
+        self.assertEqual(self.dates(clone), sorted(d + timedelta(days=7) for d in [self.old_day, *self.days]))
+        seed = EventItem.objects.get(event=clone, title="Seed")
+        self.assertEqual((seed.notes, seed.time), ("n", time(8, 0)))
+        # The source is untouched
+        self.assertEqual(self.dates(self.event), self.days)
+        self.assertEqual(self.dates(self.event, ArchivedEventItem), [self.old_day])
+
+    def test_shift_by_days(self):
+        response = self.post("shift", {"days": -2})
+        self.assertEqual(response.json(), {"items_shifted": 3, "days": -2})
+        self.assertEqual(self.dates(self.event, ArchivedEventItem), [self.old_day - timedelta(days=2)])
+        self.assertEqual(self.dates(self.event), [d - timedelta(days=2) for d in self.days])
+
+    def test_shift_to_start_moves_earliest_item_there(self):
+        start = self.old_day + timedelta(days=30)  # past the cutoff
+        response = self.post("shift", {"start": start.isoformat()})
+        self.assertEqual(response.json()["days"], 30)
+        # The archived item moved past the cutoff is back in the hot table
+        self.assertFalse(ArchivedEventItem.objects.filter(event=self.event).exists())
+        self.assertEqual(self.dates(self.event), [start] + [d + timedelta(days=30) for d in self.days])
+
+    def test_shift_rejects_bad_input(self):
+        self.assertEqual(self.post("shift", {"days": "2"}).status_code, 400)
+        self.assertEqual(self.post("shift", {"start": "tomorrow"}).status_code, 400)
+        self.assertEqual(self.post("shift", {"days": 10 ** 7}).status_code, 400)
+
+    def test_shift_under_unique_index(self):
+        # Moving "Water" by one day hits the next day's "Water" before that one has moved
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        events_before = Event.objects.count()
+        response = self.post("shift", {"days": 1})
+        self.assertEqual(response.json()["items_shifted"], 3)
+        self.assertEqual(self.dates(self.event), [d + timedelta(days=1) for d in self.days])
+        self.assertEqual(Event.objects.count(), events_before)  # the placeholder event is gone
+
+
+class BackupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("gina", "gina@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def account_rows(self, user):
+        rows = []
+        for model in (EventItem, ArchivedEventItem):
+            rows += model.objects.filter(event__user=user).values_list(
+                "event__title", "event__color", "date", "title", "time", "description", "notes")
+        return sorted(rows, key=repr)
+
+    def test_round_trip(self):
+        trip = Event.objects.create(user=self.user, title="Trip ✈", color="#10B981")
+        Event.objects.create(user=self.user, title="Empty", color="#000000")
+        EventItem.objects.bulk_create([
+            EventItem(event=trip, date=date(2025, 8, 12), title="Flight", time=time(7, 5, 30),
+                      description="Gate B12", notes="Window seat\nüber"),
+            EventItem(event=trip, date=date(2025, 8, 13), title="Museum", time=None, description=None, notes=None),
+            EventItem(event=trip, date=date(2025, 8, 14), title="", time=time(0, 0), description="", notes=""),
+            EventItem(event=trip, date=date(2010, 1, 1), title="Old trip", notes="archived"),
+        ])
+        archive_old_items()
+        self.assertEqual(ArchivedEventItem.objects.count(), 1)
+        expected = self.account_rows(self.user)
+
+        response = self.client.get("/api/backup")
+        backup = b"".join(response.streaming_content)
+        response = self.client.post("/api/restore?mode=replace", backup, content_type="application/octet-stream")
+        self.assertEqual(response.json()["items_created"], 4)
+
+        self.assertEqual(self.account_rows(self.user), expected)
+        self.assertEqual(Event.objects.filter(user=self.user).count(), 2)
+        # Archived items come back into the hot table
+        self.assertEqual(ArchivedEventItem.objects.count(), 0)
+
+    def test_events_created_while_streaming_are_left_out(self):
+        event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+        EventItem.objects.create(event=event, date=date(2025, 8, 12), title="Run")
+        records = _records(self.user)
+        first = next(records)  # the events have been read
+        self.assertTrue(first.startswith(EVENT))
+        late = Event.objects.create(user=self.user, title="Late", color="#3B82F6")
+        EventItem.objects.create(event=late, date=date(2025, 8, 12), title="Swim")
+        backup = b"".join(compress([first, *records]))
+        other = User.objects.create_user("hank", "hank@example.com", "pw")
+        self.client.force_login(other)
+        response = self.client.post("/api/restore", backup, content_type="application/octet-stream")
+        self.assertEqual(response.json()["items_created"], 1)
+
+    def test_oversized_record_is_rejected_before_reading(self):
+        event = Event.objects.create(user=self.user, title="Kept", color="#3B82F6")
+        # A header announcing a 4 GiB payload, as a small gzip bomb would
+        backup = b"".join(compress([struct.pack(">cI", EVENT, 0xFFFFFFFE)]))
+        with patch("gzip.GzipFile.read", autospec=True, side_effect=gzip.GzipFile.read) as read:
+            response = self.client.post("/api/restore?mode=replace", backup, content_type="application/octet-stream")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exceeds", response.json()["error"])
+        self.assertLessEqual(max(call.args[1] for call in read.call_args_list), MAX_RECORD_SIZE)
+        self.assertTrue(Event.objects.filter(id=event.id).exists())
+
+
+class SnapshotTests(TestCase):
+    """A snapshot URL must stop answering once any item of its year changes, however it is written."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("dave", "dave@example.com", "pw")
+        self.client.force_login(self.user)
+        # Invalidations run when the writing transaction commits, which tests have to simulate
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event = Event.objects.create(user=self.user, title="Trips", color="#3B82F6")
+            self.item = EventItem.objects.create(event=self.event, date=date(2015, 5, 1), title="Rome")
+
+    def snapshot_url(self, year=2015):
+        return self.client.get(f"/api/snapshots?years={year}").json().get(str(year))
+
+    def assertReplaced(self, url, year=2015):
+        self.assertEqual(self.client.get(url).status_code, 404)
+        new_url = self.snapshot_url(year)
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+        return new_url
+
+    def test_api_edit_changes_digest(self):
+        url = self.snapshot_url()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/items/{self.item.id}", json.dumps({"title": "Florence"}),
+                              content_type="application/json")
+        new_url = self.assertReplaced(url)
+        self.assertEqual(self.client.get(new_url).json()["items"][0]["title"], "Florence")
+
+    def test_moving_item_replaces_both_years(self):
+        url_2015, url_2016 = self.snapshot_url(2015), self.snapshot_url(2016)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/items/{self.item.id}", json.dumps({"date": "2016-05-01"}),
+                              content_type="application/json")
+        self.assertEqual(self.client.get(self.assertReplaced(url_2015, 2015)).json()["items"], [])
+        self.assertEqual(len(self.client.get(self.assertReplaced(url_2016, 2016)).json()["items"]), 1)
+
+    def test_orm_writes_invalidate(self):
+        # As done by the admin, or any code that saves or deletes items directly
+        url = self.snapshot_url()
+        item = EventItem.objects.get(id=self.item.id)
+        item.notes = "changed"
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        url = self.assertReplaced(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertReplaced(url)
+
+    def test_write_during_build_is_not_stored(self):
+        from . import snapshots
+
+        build = snapshots._build
+
+        def build_then_write(user, years):
+            built = build(user, years)
+            with self.captureOnCommitCallbacks(execute=True):
+                EventItem.objects.create(event=self.event, date=date(2015, 6, 1), title="Paris")
+            return built
+
+        with patch.object(snapshots, "_build", build_then_write):
+            self.assertEqual(self.client.get("/api/snapshots?years=2015").json(), {})
+        items = self.client.get(self.snapshot_url()).json()["items"]
+        self.assertEqual([i["title"] for i in items], ["Rome", "Paris"])
+
+    def test_rolled_back_write_keeps_snapshot(self):
+        url = self.snapshot_url()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                EventItem.objects.filter(id=self.item.id).first().delete()
+                transaction.set_rollback(True)
+        self.assertEqual(self.snapshot_url(), url)
+
+    def test_archiving_keeps_snapshots(self):
+        url = self.snapshot_url()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_old_items(), 1)
+        self.assertEqual(self.snapshot_url(), url)
+        self.assertEqual(self.client.get(url).json()["items"][0]["id"], self.item.id)
+
+    def test_bulk_deletes_send_no_signals_and_invalidate_once(self):
+        EventItem.objects.create(event=self.event, date=date(2015, 5, 1), title="Rome")
+        url = self.snapshot_url()
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.id)  # noqa: E731
+        post_delete.connect(receiver, sender=EventItem)
+        self.addCleanup(post_delete.disconnect, receiver, sender=EventItem)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/maintenance/dedupe-items")
+        self.assertEqual(deleted, [])
+        url = self.assertReplaced(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/events/{self.event.id}")
+        self.assertEqual(deleted, [])
+        self.assertFalse(EventItem.objects.exists())
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(self.snapshot_url()).json()["items"], [])
+
+
+class DedupeTests(TestCase):
+    """Merging keeps the oldest item of each (event, date, title), and the unique index is enforced cleanly."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("erin", "erin@example.com", "pw")
+        self.client.force_login(self.user)
+        self.event = Event.objects.create(user=self.user, title="Plants", color="#3B82F6")
+
+    def add(self, title="Water", day=date(2025, 8, 12), notes=None):
+        return EventItem.objects.create(event=self.event, date=day, title=title, notes=notes)
+
+    def test_merge_keeps_oldest_and_joins_notes(self):
+        keep = self.add(notes="ferns")
+        copies = [self.add(notes="cacti"), self.add(notes="ferns"), self.add(notes="  "), self.add()]
+        other = self.add(day=date(2025, 8, 13), notes="other day")
+        result = merge_duplicates()
+        self.assertEqual(result, {"groups": 1, "deleted": 4, "merged": 1, "event_ids": {self.event.id}})
+        self.assertEqual(list(EventItem.objects.order_by("id").values_list("id", flat=True)), [keep.id, other.id])
+        self.assertEqual(EventItem.objects.get(id=keep.id).notes, "ferns\n\ncacti")
+        self.assertFalse(EventItem.objects.filter(id__in=[c.id for c in copies]).exists())
+
+    def test_merge_without_notes_keeps_keeper_notes(self):
+        keep = self.add(notes="ferns")
+        self.add(notes="cacti")
+        self.assertEqual(merge_duplicates(merge_notes=False)["merged"], 0)
+        self.assertEqual(EventItem.objects.get().notes, "ferns")
+        self.assertEqual(EventItem.objects.get().id, keep.id)
+
+    def test_merge_endpoint_only_touches_own_items(self):
+        self.add()
+        self.add()
+        stranger = User.objects.create_user("frank", "frank@example.com", "pw")
+        theirs = Event.objects.create(user=stranger, title="Plants", color="#3B82F6")
+        for _ in range(2):
+            EventItem.objects.create(event=theirs, date=date(2025, 8, 12), title="Water")
+        self.client.post("/api/maintenance/dedupe-items")
+        self.assertEqual(EventItem.objects.filter(event=self.event).count(), 1)
+        self.assertEqual(EventItem.objects.filter(event=theirs).count(), 2)
+
+    def test_updates_clashing_with_unique_index_conflict(self):
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        self.add()
+        other = self.add(day=date(2025, 8, 13))
+        response = self.client.patch(f"/api/items/{other.id}", json.dumps({"date": "2025-08-12"}),
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        response = self.client.put("/api/items", json.dumps(
+            {"id": other.id, "title": "Water", "date": "2025-08-12"}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(EventItem.objects.get(id=other.id).date, date(2025, 8, 13))
+
+    def test_import_counts_rows_dropped_by_unique_index(self):
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        from . import views
+
+        def archived_items_racing_insert(*args, **kwargs):
+            self.add(title="Repot")  # a concurrent request inserts the same item meanwhile
+            return []
+
+        payload = {"event": {"title": "Plants"}, "items": [{"title": "Repot", "date": "2025-08-12"},
+                                                            {"title": "Prune", "date": "2025-08-12"}]}
+        with patch.object(views, "archived_items", archived_items_racing_insert):
+            response = self.client.post("/api/import", json.dumps({"data": json.dumps(payload)}),
+                                        content_type="application/json")
+        self.assertEqual(response.json()["items_created"], 1)
+        self.assertEqual(EventItem.objects.filter(event=self.event).count(), 2)
+
+
+    def archive(self, item):
+        """Move item into the archive as archive_old_items() would."""
+        ArchivedEventItem.objects.create(**{f: getattr(item, f) for f in ITEM_COLUMNS})
+        EventItem.objects.filter(id=item.id).delete()
+
+    def test_merge_spans_archive(self):
+        old_day = archive_cutoff() - timedelta(days=10)
+        archived_keep = self.add(day=old_day, notes="ferns")
+        hot_copy = self.add(day=old_day, notes="cacti")
+        hot_keep = self.add(title="Repot", day=old_day)
+        archived_copy = self.add(title="Repot", day=old_day, notes="pots")
+        self.archive(archived_keep)
+        self.archive(archived_copy)
+        self.assertEqual(len(merge_duplicates()["event_ids"]), 1)
+        self.assertEqual(ArchivedEventItem.objects.get().id, archived_keep.id)
+        self.assertEqual(ArchivedEventItem.objects.get().notes, "ferns\n\ncacti")
+        self.assertEqual(list(EventItem.objects.values_list("id", "notes")), [(hot_keep.id, "pots")])
+        self.assertFalse(EventItem.objects.filter(id=hot_copy.id).exists())
+
+    def test_unique_index_mode_checks_archive(self):
+        old_day = archive_cutoff() - timedelta(days=10)
+        archived = self.add(day=old_day)
+        self.archive(archived)
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        response = self.client.post("/api/items", json.dumps(
+            {"event_id": self.event.id, "date": str(old_day), "title": "Water"}), content_type="application/json")
+        self.assertEqual((response.status_code, response.json()["id"]), (200, archived.id))
+        self.assertFalse(EventItem.objects.exists())
+
+    def test_restoring_over_hot_copy_conflicts(self):
+        old_day = archive_cutoff() - timedelta(days=10)
+        archived = self.add(day=old_day)
+        self.archive(archived)
+        self.add(day=old_day)  # written before the index existed
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        response = self.client.patch(f"/api/items/{archived.id}", json.dumps({"notes": "more"}),
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(ArchivedEventItem.objects.filter(id=archived.id).exists())
+
+    def test_archive_command_merges_before_restoring(self):
+        archived = self.add(day=archive_cutoff(), notes="ferns")
+        self.archive(archived)  # e.g. left behind by a raised horizon
+        self.add(day=archive_cutoff(), notes="cacti")
+        add_unique_index()
+        self.addCleanup(drop_unique_index)
+        call_command("archive_items", stdout=StringIO())
+        self.assertFalse(ArchivedEventItem.objects.exists())
+        self.assertEqual(list(EventItem.objects.values_list("id", "notes")), [(archived.id, "ferns\n\ncacti")])
+
+
+class AdminTests(TestCase):
+    """Changelists of large tables: estimated counts and index-only search."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("gus", "gus@example.com", "pw")
+        self.event = Event.objects.create(user=self.user, title="Alpha", color="#3B82F6")
+        for title in ("Alpha", "alpha", "Alpine", "Al", "Beta"):
+            EventItem.objects.create(event=self.event, date=date(2025, 1, 1), title=title)
+
+    def paginator_count(self, qs, estimate):
+        with patch("core.admin.estimated_row_count", return_value=estimate) as estimated:
+            count = EstimatedCountPaginator(qs, 100).count
+        return count, estimated.called
+
+    def test_paginator_uses_estimate_above_threshold(self):
+        qs = EventItem.objects.order_by("id")
+        self.assertEqual(self.paginator_count(qs, 250_000), (250_000, True))
+        self.assertEqual(self.paginator_count(qs, 99_999), (5, True))  # below the threshold
+        self.assertEqual(self.paginator_count(qs, None), (5, True))  # no statistics
+
+    def test_paginator_counts_filtered_lists_exactly(self):
+        qs = EventItem.objects.filter(title="Beta").order_by("id")
+        self.assertEqual(self.paginator_count(qs, 250_000), (1, False))
+
+    def test_estimated_row_count_reads_sqlite_stats(self):
+        self.assertIsNone(estimated_row_count(EventItem))  # before ANALYZE
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(estimated_row_count(EventItem), 5)
+
+    def search(self, model, term):
+        queryset, may_have_duplicates = admin.site._registry[model].get_search_results(
+            None, model.objects.all(), term)
+        self.assertFalse(may_have_duplicates)
+        return queryset
+
+    def test_text_search_is_case_sensitive_prefix(self):
+        titles = sorted(self.search(EventItem, "Alp").values_list("title", flat=True))
+        self.assertEqual(titles, ["Alpha", "Alpine"])
+        self.assertFalse(self.search(EventItem, "alph").filter(title="Alpha").exists())
+        self.assertEqual(self.search(EventItem, "  ").count(), 5)
+
+    def test_numeric_search_matches_keys(self):
+        item = EventItem.objects.get(title="Beta")
+        self.assertEqual(list(self.search(EventItem, str(item.id))), [item])
+        self.assertEqual(self.search(EventItem, str(self.event.id)).count(), 5)  # event_id
+        self.assertEqual(list(self.search(Event, str(self.user.id))), [self.event])  # user_id
+
+    def test_event_search_matches_exact_username(self):
+        self.assertEqual(list(self.search(Event, "gus")), [self.event])
+        self.assertFalse(self.search(Event, "gu").exists())
+
+    def test_prefix_search_seeks_title_index(self):
+        sql, params = self.search(EventItem, "Alp").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn("SEARCH core_eventitem USING INDEX core_item_title_prefix_idx", plan)
+
+
+class ItemTimeTests(TestCase):
+    """Item times are stored as times of day and exchanged as HH:MM."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("carol", "carol@example.com", "pw")
+        self.client.force_login(self.user)
+        self.event = Event.objects.create(user=self.user, title="Gym", color="#3B82F6")
+
+    def create(self, value):
+        return self.client.post("/api/items", json.dumps(
+            {"event_id": self.event.id, "date": "2025-08-12", "title": "Run", "time": value}),
+            content_type="application/json")
+
+    def test_times_are_normalized(self):
+        for value, expected in (("9:05", "09:05"), ("2:30 pm", "14:30"), ("07:15:30", "07:15:30"), ("", None)):
+            with self.subTest(value=value):
+                self.assertEqual(self.create(value).json()["time"], expected)
+
+    def test_invalid_time_is_rejected(self):
+        self.assertEqual(self.create("after lunch").status_code, 422)
+        self.assertEqual(self.create("2025").status_code, 422)  # digits alone are not read as 20:25
+        self.assertEqual(self.client.get("/api/items?start_time=25:00").status_code, 422)
+
+    def test_time_range_filter(self):
+        for value in ("06:00", "12:00", "23:00", ""):
+            self.create(value)
+        response = self.client.get("/api/items?start_time=11:00&end_time=13:00")
+        self.assertEqual([i["time"] for i in response.json()], ["12:00"])
+        # A range ending before it starts wraps past midnight
+        response = self.client.get("/api/items?start_time=22:00&end_time=07:00")
+        self.assertEqual(sorted(i["time"] for i in response.json()), ["06:00", "23:00"])
+
+    def test_import_keeps_free_text_times_in_notes(self):
+        payload = {"event": {"title": "Gym"}, "items": [{"title": "Swim", "date": "2025-01-01", "time": "morning",
+                                                         "notes": "pool"}]}
+        self.client.post("/api/import", json.dumps({"data": json.dumps(payload)}), content_type="application/json")
+        item = EventItem.objects.get(title="Swim")
+        self.assertIsNone(item.time)
+        self.assertEqual(item.notes, "Time: morning\npool")
+
+
+@override_settings(**AUTH_CACHE_SETTINGS)
+class AuthCacheTests(TestCase):
+    """The cached session and user must not outlive a logout or a profile change."""
+
+    def setUp(self):
+        caches["auth"].clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def test_api_call_runs_no_auth_queries(self):
+        with self.assertNumQueries(1):
+            self.client.get("/api/events?fields=title")
+
+    def test_profile_change_is_visible(self):
+        self.client.post("/settings/", {"username": "alice2", "email": "alice@example.com",
+                                        "first_name": "Alice", "last_name": ""})
+        self.client.get("/api/events")  # re-caches the user
+        response = self.client.get("/settings/")
+        self.assertContains(response, "alice2")
+        self.assertContains(response, "Alice")
+
+    def test_logout_ends_session(self):
+        self.client.get("/api/events")
+        self.client.post("/accounts/logout/")
+        self.assertEqual(self.client.get("/api/events").status_code, 302)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get("/api/events")
+        self.user.set_password("new-pw")
+        self.user.save()
+        self.assertEqual(self.client.get("/api/events").status_code, 302)
+
+
+@override_settings(METRICS_TOKEN="", DEBUG=True)
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob", "bob@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get("/api/events")
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('colendar_requests_total{method="GET",status="200",view="events_api"}', body)
+        self.assertIn('colendar_request_db_queries_count{view="events_api"}', body)
+
+    def test_import_throughput_is_recorded(self):
+        payload = {"event": {"title": "Imported"}, "items": [{"title": "a", "date": "2025-01-01"}, {"title": "b"}]}
+        self.client.post("/api/import", json.dumps({"data": json.dumps(payload)}), content_type="application/json")
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('colendar_imported_items_total{result="created",source="json"}', body)
+        self.assertIn('colendar_imported_items_total{result="invalid",source="json"}', body)
+
+    @override_settings(METRICS_TOKEN="secret", DEBUG=False)
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+    @override_settings(DEBUG=False)
+    def test_hidden_without_token_unless_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
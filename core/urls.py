@@ -11,14 +11,31 @@ urlpatterns = [
     # API endpoints
     path('api/events', views.events_api, name='events_api'),
     path('api/events/<int:event_id>', views.event_detail, name='event_detail_api'),
+    path('api/events/<int:event_id>/stats', views.event_stats_api, name='event_stats'),
+    # Copy an event or move its items in time, in a single statement (core/event_ops.py)
+    path('api/events/<int:event_id>/clone', views.event_clone, name='event_clone'),
+    path('api/events/<int:event_id>/shift', views.event_shift, name='event_shift'),
     path('api/items', views.items_api, name='items_api'),
     path('api/items/<int:item_id>', views.item_detail, name='item_detail'),
+    # Immutable per-year item snapshots for closed years (core/snapshots.py)
+    path('api/snapshots', views.snapshot_index, name='snapshot_index'),
+    path('api/snapshots/<int:year>/<str:digest>', views.year_snapshot, name='year_snapshot'),
+    # Server-sent change notifications (served through colendar_site.asgi)
+    path('api/stream', views.stream_api, name='stream_api'),
 
     # Export/Import endpoints
     path('api/export/event/<int:event_id>', views.export_event, name='export_event'),
     path('api/import', views.import_data, name='import_data'),
+    # Compressed whole-account backup (core/backup.py)
+    path('api/backup', views.backup_account, name='backup_account'),
+    path('api/restore', views.restore_account, name='restore_account'),
     # Maintenance endpoint to strip date suffixes from item titles
     path('api/maintenance/strip-item-title-dates', views.strip_dates_from_item_titles, name='strip_item_title_dates'),
+    # Maintenance endpoint to find/merge duplicate items (same event, date and title)
+    path('api/maintenance/dedupe-items', views.dedupe_items, name='dedupe_items'),
+
+    # Prometheus scrape endpoint (core/metrics.py)
+    path('metrics', views.metrics, name='metrics'),
 
     path('accounts/', include('allauth.urls')),
 ]
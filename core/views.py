@@ -1,4 +1,6 @@
+import asyncio
 import json
+import logging
 import re
 from datetime import datetime, date, timedelta
 from typing import Optional
@@ -6,14 +8,35 @@ import random
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import HttpRequest, HttpResponse, JsonResponse, HttpResponseNotAllowed
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404, HttpRequest, HttpResponse, JsonResponse, HttpResponseNotAllowed, StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.conf import settings
+from django.db import IntegrityError, transaction
 import time
 
-from .models import Event, EventItem
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .archive import archived_items, restore_item
+from .backup import BackupError, backup_chunks, restore_backup
+from .broadcast import broadcaster, notify_change
+from .dedupe import archived_duplicate, duplicate_groups, merge_duplicates
+from .event_ops import check_shift, clone_items, delete_event, item_date_range, shift_items
+from .metrics import IMPORT_DURATION, IMPORTED_ITEMS, render as render_metrics
+from .models import (
+    Event, EventItem, YearSnapshot, coerce_item_time, format_item_time, parse_item_time, time_range_q,
+)
+from .snapshots import PENDING, invalidate_snapshots, year_snapshots
+from .stats import event_stats, mark_items_changed
+
+logger = logging.getLogger(__name__)
 
 
 def get_random_color():
@@ -106,7 +129,7 @@ def create_sample_data_for_user(user):
             EventItem.objects.create(
                 event=event1,
                 title=item_title,
-                time=time_str,
+                time=parse_item_time(time_str),
                 description=description,
                 notes="Sample item - feel free to edit or delete!",
                 date=day
@@ -134,7 +157,7 @@ def create_sample_data_for_user(user):
             EventItem.objects.create(
                 event=event2,
                 title=item_title,
-                time=time_str,
+                time=parse_item_time(time_str),
                 description=description,
                 notes="Sample item - feel free to edit or delete!",
                 date=day
@@ -213,6 +236,7 @@ def event_detail_page(request, event_id):
     """Display a detailed view of an event with all its items"""
     event = get_object_or_404(Event, id=event_id, user=request.user)
     items = EventItem.objects.filter(event=event).order_by('date', 'time')
+    items = archived_items(request.user, event_ids=[event.id]) + list(items)
 
     context = {
         'event': event,
@@ -221,6 +245,14 @@ def event_detail_page(request, event_id):
     return render(request, "core/event_detail.html", context)
 
 
+def _record_import(source: str, started: float, **counts) -> None:
+    """Import throughput metrics: items per result and the time since `started` (perf_counter)."""
+    for result, n in counts.items():
+        if n:
+            IMPORTED_ITEMS.labels(source, result).inc(n)
+    IMPORT_DURATION.labels(source).observe(time.perf_counter() - started)
+
+
 def _json(request: HttpRequest) -> dict:
     if request.body:
         try:
@@ -230,16 +262,59 @@ def _json(request: HttpRequest) -> dict:
     return {}
 
 
+def _requested_fields(request: HttpRequest, model) -> Optional[tuple]:
+    """Parse ?fields=a,b into a tuple of to_dict() keys (without the implicit id), or None when absent."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in model.API_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in fields if f != 'id')
+
+
+def _parse_date_param(value: Optional[str]) -> Optional[date]:
+    """Parse an optional YYYY-MM-DD query parameter; raises ValueError on bad input."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+INVALID_TIME = {"detail": "Invalid time format, expected HH:MM"}
+# The optional unique (event, date, title) index (core/dedupe.py) rejected an update
+DUPLICATE_ITEM = {"detail": "The event already has an item with this title on that date"}
+
+
+def _parse_time_param(value: Optional[str]):
+    """Parse an optional HH:MM query parameter; raises ValueError on bad input."""
+    return parse_item_time(value) if value else None
+
+
+def _only_columns(fields: tuple) -> list:
+    """Model columns backing the requested to_dict() keys, for QuerySet.only()."""
+    return ['id'] + [f for f in fields if f != 'items']
+
+
 @login_required
 @csrf_exempt
 def events_api(request, event_id=None):
     if request.method == 'GET':
+        try:
+            fields = _requested_fields(request, Event)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        events = Event.objects.filter(user=request.user)
+        if fields is not None:
+            events = events.only(*_only_columns(fields))
+        if fields is None or 'items' in fields:
+            # One query for all events' items instead of one per event
+            events = events.prefetch_related('items')
         if event_id:
-            event = get_object_or_404(Event, id=event_id, user=request.user)
-            return JsonResponse(event.to_dict())
+            event = get_object_or_404(events, id=event_id)
+            return JsonResponse(event.to_dict(fields=fields))
         else:
-            events = Event.objects.filter(user=request.user)
-            return JsonResponse([event.to_dict() for event in events], safe=False)
+            return JsonResponse([event.to_dict(fields=fields) for event in events], safe=False)
     elif request.method == 'POST':
         data = json.loads(request.body)
         event = Event.objects.create(
@@ -259,13 +334,13 @@ def events_api(request, event_id=None):
         if event_id:
             # Delete specific event
             event = get_object_or_404(Event, id=event_id, user=request.user)
-            event.delete()
+            delete_event(event)
             return JsonResponse({}, status=204)
         else:
             # Delete event from request body (for backward compatibility)
             data = json.loads(request.body)
             event = Event.objects.get(id=data['id'], user=request.user)
-            event.delete()
+            delete_event(event)
             return JsonResponse({}, status=204)
 
 # @login_required
@@ -280,47 +355,192 @@ def event_detail(request: HttpRequest, event_id: int):
         ev.save()
         return JsonResponse(ev.to_dict(include_items=False))
     if request.method == "DELETE":
-        ev.delete()
+        delete_event(ev)
         return HttpResponse(status=204)
     return HttpResponseNotAllowed(["PATCH", "DELETE"])
 
 
+def _shift_days(data: dict, bounds: Optional[tuple]) -> int:
+    """Days to move items spanning `bounds` by, from {"days": N} or {"start": "YYYY-MM-DD"} (new first date)."""
+    if 'start' in data:
+        try:
+            start = _parse_date_param(data['start'])
+        except (ValueError, TypeError):
+            start = None
+        if start is None:
+            raise ValueError('start must be a YYYY-MM-DD date')
+        days = (start - bounds[0]).days if bounds else 0
+    elif 'days' in data:
+        days = data['days']
+        if not isinstance(days, int) or isinstance(days, bool):
+            raise ValueError('days must be an integer')
+    else:
+        raise ValueError('Provide "days" or "start"')
+    check_shift(bounds, days)
+    return days
+
+
+@login_required
+@csrf_exempt
+def event_clone(request: HttpRequest, event_id: int):
+    """Copy an event with all its items, optionally moved by {"days": N} or to a new {"start": date}"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    source = get_object_or_404(Event, id=event_id, user=request.user)
+    data = _json(request)
+    try:
+        days = _shift_days(data, item_date_range(source)) if 'days' in data or 'start' in data else 0
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    with transaction.atomic():
+        clone = Event.objects.create(
+            user=request.user,
+            title=data.get('title') or f"{source.title} (copy)",
+            color=data.get('color') or source.color,
+        )
+        created = clone_items(source, clone, days)
+    invalidate_snapshots(request.user.id)
+    return JsonResponse({'event': clone.to_dict(include_items=False), 'items_created': created}, status=201)
+
+
+@login_required
+@csrf_exempt
+def event_shift(request: HttpRequest, event_id: int):
+    """Move all items of an event by {"days": N} or so that the first one falls on {"start": date}"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    event = get_object_or_404(Event, id=event_id, user=request.user)
+    try:
+        days = _shift_days(_json(request), item_date_range(event))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    shifted = shift_items(event, days) if days else 0
+    if shifted:
+        mark_items_changed([event.id])
+        invalidate_snapshots(request.user.id)
+        notify_change(request.user.id, 'event', event.id, 'items')
+    return JsonResponse({'items_shifted': shifted, 'days': days})
+
+
+@login_required
+def event_stats_api(request: HttpRequest, event_id: int):
+    """Item counts per month and weekday, first/last dates and streaks for one event"""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    event = get_object_or_404(Event, id=event_id, user=request.user)
+    return JsonResponse(event_stats(event))
+
+
 @login_required
 @csrf_exempt
 def items_api(request):
     if request.method == 'GET':
         event_id = request.GET.get('event_id')
+        event_ids = request.GET.get('event_ids')
         date_str = request.GET.get('date')
+        try:
+            fields = _requested_fields(request, EventItem)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        columns = _only_columns(fields) if fields is not None else None
+        try:
+            start_time = _parse_time_param(request.GET.get('start_time'))
+            end_time = _parse_time_param(request.GET.get('end_time'))
+        except ValueError:
+            return JsonResponse(INVALID_TIME, status=422)
+        time_filter = {'start_time': start_time, 'end_time': end_time}
+        in_time_range = time_range_q(start_time, end_time)
+
+        if event_ids is not None:
+            # Several events over a date window in one query, grouped by event id
+            try:
+                ids = [int(i) for i in event_ids.split(',') if i.strip()]
+            except ValueError:
+                return JsonResponse({'error': 'event_ids must be a comma-separated list of integers'}, status=400)
+            try:
+                start = _parse_date_param(request.GET.get('start'))
+                end = _parse_date_param(request.GET.get('end'))
+            except ValueError:
+                return JsonResponse({"detail": "Invalid date format, expected YYYY-MM-DD"}, status=422)
+            items = EventItem.objects.filter(in_time_range, event_id__in=ids, event__user=request.user)
+            if start:
+                items = items.filter(date__gte=start)
+            if end:
+                items = items.filter(date__lte=end)
+            if columns and 'event_id' not in columns:
+                columns = columns + ['event_id']  # needed for grouping even when not returned
+            if columns:
+                items = items.only(*columns)
+            grouped = {str(i): [] for i in ids}
+            archived = archived_items(request.user, event_ids=ids, start=start, end=end, columns=columns, **time_filter)
+            for item in archived + list(items):
+                grouped[str(item.event_id)].append(item.to_dict(fields))
+            return JsonResponse(grouped)
 
         if event_id:
             items = EventItem.objects.filter(event_id=event_id, event__user=request.user)
+            archive_filter = {'event_ids': [event_id]}
         elif date_str:
-            items = EventItem.objects.filter(date=date_str, event__user=request.user)
+            try:
+                on_date = _parse_date_param(date_str)
+            except ValueError:
+                return JsonResponse({"detail": "Invalid date format, expected YYYY-MM-DD"}, status=422)
+            items = EventItem.objects.filter(date=on_date, event__user=request.user)
+            archive_filter = {'start': on_date, 'end': on_date}
         else:
             items = EventItem.objects.filter(event__user=request.user)
+            archive_filter = {}
 
-        return JsonResponse([item.to_dict() for item in items], safe=False)
+        items = items.filter(in_time_range)
+        if columns:
+            items = items.only(*columns)
+        items = archived_items(request.user, columns=columns, **archive_filter, **time_filter) + list(items)
+        return JsonResponse([item.to_dict(fields) for item in items], safe=False)
     elif request.method == 'POST':
         data = json.loads(request.body)
         event = Event.objects.get(id=data['event_id'], user=request.user)
-        item = EventItem.objects.create(
-            event=event,
-            title=data['title'],
-            time=data.get('time', ''),
-            description=data.get('description', ''),
-            notes=data.get('notes', ''),
-            date=datetime.strptime(data['date'], '%Y-%m-%d').date()
-        )
+        item_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        try:
+            item_time = parse_item_time(data.get('time'))
+        except ValueError:
+            return JsonResponse(INVALID_TIME, status=422)
+        # The optional unique index only covers the hot table; old dates may clash with the archive
+        existing = archived_duplicate(event.id, item_date, data['title'])
+        if existing is not None:
+            return JsonResponse(existing.to_dict())
+        try:
+            with transaction.atomic():
+                item = EventItem.objects.create(
+                    event=event,
+                    title=data['title'],
+                    time=item_time,
+                    description=data.get('description', ''),
+                    notes=data.get('notes', ''),
+                    date=item_date
+                )
+        except IntegrityError:
+            # The optional unique (event, date, title) index caught a duplicate (e.g. a double-click)
+            item = EventItem.objects.get(event=event, date=item_date, title=data['title'])
+            return JsonResponse(item.to_dict())
         return JsonResponse(item.to_dict(), status=201)
     elif request.method == 'PUT':
         data = json.loads(request.body)
         item = EventItem.objects.get(id=data['id'], event__user=request.user)
+        try:
+            item.time = parse_item_time(data.get('time'))
+        except ValueError:
+            return JsonResponse(INVALID_TIME, status=422)
         item.title = data['title']
-        item.time = data.get('time', '')
         item.description = data.get('description', '')
         item.notes = data.get('notes', '')
         item.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        item.save()
+        try:
+            with transaction.atomic():
+                item.save()
+        except IntegrityError:
+            return JsonResponse(DUPLICATE_ITEM, status=409)
         return JsonResponse(item.to_dict())
     elif request.method == 'DELETE':
         data = json.loads(request.body)
@@ -348,6 +568,10 @@ def items_collection(request: HttpRequest):
             parsed_date = datetime.strptime(data.get("date"), "%Y-%m-%d").date()
         except Exception:
             return JsonResponse({"detail": "Invalid date format, expected YYYY-MM-DD"}, status=422)
+        try:
+            parsed_time = parse_item_time(data.get("time"))
+        except ValueError:
+            return JsonResponse(INVALID_TIME, status=422)
         try:
             ev = Event.objects.get(id=data.get("event_id"), user=request.user)
         except Event.DoesNotExist:
@@ -356,7 +580,7 @@ def items_collection(request: HttpRequest):
             event=ev,
             date=parsed_date,
             title=data.get("title") or "",
-            time=data.get("time"),
+            time=parsed_time,
             notes=data.get("notes"),
         )
         return JsonResponse(item.to_dict(), status=201)
@@ -366,14 +590,28 @@ def items_collection(request: HttpRequest):
 @login_required
 @csrf_exempt
 def item_detail(request: HttpRequest, item_id: int):
-    item = get_object_or_404(EventItem, id=item_id, event__user=request.user)
+    item = EventItem.objects.filter(id=item_id, event__user=request.user).first()
+    if item is None and request.method in ("PATCH", "DELETE"):
+        # Editing an archived item moves it back to the hot table first
+        try:
+            item = restore_item(request.user, item_id)
+        except IntegrityError:
+            # A hot copy with the same (event, date, title) exists under the optional unique index
+            return JsonResponse(DUPLICATE_ITEM, status=409)
+    if item is None:
+        raise Http404("No EventItem matches the given query.")
     if request.method == "PATCH":
         data = _json(request)
-        for field in ("title", "time", "notes"):
+        for field in ("title", "notes"):
             if field in data:
                 setattr(item, field, data[field])
 
-        # Handle date field separately since it needs parsing
+        # Handle date and time fields separately since they need parsing
+        if "time" in data:
+            try:
+                item.time = parse_item_time(data["time"])
+            except ValueError:
+                return JsonResponse(INVALID_TIME, status=422)
         if "date" in data:
             try:
                 parsed_date = datetime.strptime(data["date"], "%Y-%m-%d").date()
@@ -381,7 +619,11 @@ def item_detail(request: HttpRequest, item_id: int):
             except Exception:
                 return JsonResponse({"detail": "Invalid date format, expected YYYY-MM-DD"}, status=422)
 
-        item.save()
+        try:
+            with transaction.atomic():
+                item.save()
+        except IntegrityError:
+            return JsonResponse(DUPLICATE_ITEM, status=409)
         return JsonResponse(item.to_dict())
     if request.method == "DELETE":
         item.delete()
@@ -394,6 +636,7 @@ def export_event(request, event_id):
     """Export an event and all its items to JSON format"""
     event = get_object_or_404(Event, id=event_id, user=request.user)
     items = EventItem.objects.filter(event=event).order_by('date', 'time')
+    items = archived_items(request.user, event_ids=[event.id]) + list(items)
 
     # Create JSON export data
     export_data = {
@@ -408,7 +651,7 @@ def export_event(request, event_id):
         item_data = {
             'title': item.title,
             'date': item.date.strftime('%Y-%m-%d'),
-            'time': item.time or '',
+            'time': format_item_time(item.time) or '',
             'notes': item.notes or ''
         }
         export_data['items'].append(item_data)
@@ -419,7 +662,7 @@ def export_event(request, event_id):
     return JsonResponse({
         'export_text': export_text,
         'event_title': event.title,
-        'items_count': items.count()
+        'items_count': len(items)
     })
 
 @login_required
@@ -429,6 +672,7 @@ def import_data(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+    started = time.perf_counter()
     try:
         data = json.loads(request.body)
         import_text = data.get('data', '').strip()
@@ -460,7 +704,6 @@ def import_data(request):
         existing_event = Event.objects.filter(user=request.user, title=event_title).first()
 
         if existing_event:
-            print(f"Debug: Event '{event_title}' already exists, using existing event")
             current_event = existing_event
         else:
             current_event = Event(
@@ -470,47 +713,67 @@ def import_data(request):
             )
             current_event.save()
             events_created += 1
-            print(f"Debug: Created new event '{event_title}'")
 
-                # Create items
+        # Existing (title, date) pairs of the event, hot and archived, in two queries
+        existing_keys = set(EventItem.objects.filter(event=current_event).values_list('title', 'date'))
+        existing_keys.update(
+            (item.title, item.date)
+            for item in archived_items(request.user, event_ids=[current_event.id], columns=['id', 'title', 'date'])
+        )
+
+        # Create items
+        new_items = []
+        skipped = {'invalid': 0, 'duplicate': 0}
+        imported_at = timezone.now()  # shared by the new rows, to count them apart from concurrent ones
         for item_data in items_data:
             if 'title' not in item_data or 'date' not in item_data:
-                print(f"Debug: Skipping item - missing title or date: {item_data}")
+                skipped['invalid'] += 1
                 continue
 
             try:
                 # Parse date
                 item_date = datetime.strptime(item_data['date'], '%Y-%m-%d').date()
-
-                                # Check if item with same title AND date already exists in this event
-                existing_item = EventItem.objects.filter(
-                    event=current_event,
-                    title=item_data['title'],
-                    date=item_date
-                ).first()
-
-                if existing_item:
-                    print(f"Debug: Item '{item_data['title']}' on date '{item_data['date']}' already exists in event '{event_title}', skipping")
-                    continue
-
-                # Create item
-                EventItem.objects.create(
-                    event=current_event,
-                    title=item_data['title'],
-                    date=item_date,
-                    time=item_data.get('time', ''),
-                    description=item_data.get('description', ''),
-                    notes=item_data.get('notes', '')
-                )
-                items_created += 1
-                print(f"Debug: Created item '{item_data['title']}' for event '{event_title}'")
-
-            except ValueError as e:
-                print(f"Debug: Invalid date format for item '{item_data.get('title', 'Unknown')}': {item_data.get('date', 'No date')}")
+            except (ValueError, TypeError):
+                skipped['invalid'] += 1
                 continue
-            except Exception as e:
-                print(f"Debug: Error creating item '{item_data.get('title', 'Unknown')}': {str(e)}")
+
+            # Skip items with the same title AND date already in this event (or earlier in this import)
+            key = (item_data['title'], item_date)
+            if key in existing_keys:
+                skipped['duplicate'] += 1
                 continue
+            existing_keys.add(key)
+
+            # Older exports hold free-text times; text that is no time of day goes to the notes
+            item_time, notes = coerce_item_time(item_data.get('time'), item_data.get('notes', ''))
+            new_items.append(EventItem(
+                event=current_event,
+                title=item_data['title'],
+                date=item_date,
+                time=item_time,
+                description=item_data.get('description', ''),
+                notes=notes,
+                created_at=imported_at,
+            ))
+
+        # ignore_conflicts: rows racing in concurrently are dropped by the optional unique index
+        items_created = 0
+        if new_items:
+            EventItem.objects.bulk_create(new_items, ignore_conflicts=True)
+            # bulk_create cannot tell which rows the index dropped, so count what was added
+            items_created = EventItem.objects.filter(event=current_event, created_at=imported_at).count()
+            skipped['duplicate'] += len(new_items) - items_created
+        _record_import('json', started, created=items_created, **skipped)
+        logger.info("import finished", extra={
+            'user_id': request.user.id, 'event_id': current_event.id, 'event_created': bool(events_created),
+            'items_created': items_created, 'items_skipped_invalid': skipped['invalid'],
+            'items_skipped_duplicate': skipped['duplicate'], 'duration_ms': round((time.perf_counter() - started) * 1000),
+        })
+
+        if items_created:
+            mark_items_changed([current_event.id])
+            invalidate_snapshots(request.user.id, {item.date.year for item in new_items})
+            notify_change(request.user.id, 'event', current_event.id, 'items')
 
         return JsonResponse({
             'success': True,
@@ -519,9 +782,53 @@ def import_data(request):
         })
 
     except Exception as e:
+        logger.warning("import failed", extra={'user_id': request.user.id, 'error': str(e)})
         return JsonResponse({'error': f'Import failed: {str(e)}'}, status=400)
 
 
+@login_required
+def backup_account(request):
+    """Download a compressed backup of all the user's events and items (see core/backup.py)"""
+    response = StreamingHttpResponse(backup_chunks(request.user), content_type='application/gzip')
+    filename = f"colendar-backup-{date.today().isoformat()}.colbak.gz"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@csrf_exempt
+def restore_account(request):
+    """Restore a backup sent as the request body or as the `file` form field.
+
+    Events from the backup are added next to the existing ones; ?mode=replace deletes
+    the existing events and items first.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    mode = request.GET.get('mode', 'append')
+    if mode not in ('append', 'replace'):
+        return JsonResponse({'error': 'mode must be "append" or "replace"'}, status=400)
+
+    # Read the body as a stream; request.body would buffer it and enforce DATA_UPLOAD_MAX_MEMORY_SIZE
+    upload = request.FILES.get('file') if request.content_type == 'multipart/form-data' else request
+    if upload is None:
+        return JsonResponse({'error': 'No backup file provided'}, status=400)
+    started = time.perf_counter()
+    try:
+        result = restore_backup(request.user, upload, replace=mode == 'replace')
+    except (BackupError, IntegrityError) as e:
+        logger.warning("restore failed", extra={'user_id': request.user.id, 'error': str(e)})
+        return JsonResponse({'error': f'Restore failed: {e}'}, status=400)
+    _record_import('backup', started, created=result['items'])
+    logger.info("restore finished", extra={
+        'user_id': request.user.id, 'mode': mode, 'events_created': result['events'],
+        'items_created': result['items'], 'duration_ms': round((time.perf_counter() - started) * 1000),
+    })
+
+    notify_change(request.user.id, 'all', None, 'resync')
+    return JsonResponse({'success': True, 'events_created': result['events'], 'items_created': result['items']})
+
+
 @login_required
 @csrf_exempt
 def strip_dates_from_item_titles(request):
@@ -543,8 +850,8 @@ def strip_dates_from_item_titles(request):
 
     compiled = [re.compile(p) for p in patterns]
 
-    items = EventItem.objects.filter(event__user=request.user)
-    changed = 0
+    items = EventItem.objects.filter(event__user=request.user).only("id", "event_id", "date", "title")
+    changed_items = []
     for it in items:
         original = it.title or ""
         new = original
@@ -553,7 +860,116 @@ def strip_dates_from_item_titles(request):
         new = new.strip()
         if new != original:
             it.title = new
-            it.save(update_fields=["title"])
-            changed += 1
+            changed_items.append(it)
+
+    # One UPDATE ... CASE statement instead of a save() per item
+    EventItem.objects.bulk_update(changed_items, ["title"])
+    changed = len(changed_items)
+    changed_event_ids = {it.event_id for it in changed_items}
 
+    mark_items_changed(changed_event_ids)
+    invalidate_snapshots(request.user.id, {it.date.year for it in changed_items})
+    for event_id in changed_event_ids:
+        notify_change(request.user.id, 'event', event_id, 'items')
     return JsonResponse({"updated": changed})
+
+
+def metrics(request):
+    """Prometheus scrape endpoint; requires "Authorization: Bearer <METRICS_TOKEN>", or DEBUG without a token"""
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404()
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+# Snapshot URLs change with their content, so browsers may keep responses for good
+SNAPSHOT_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+MAX_SNAPSHOT_YEARS = 50
+
+
+@login_required
+def snapshot_index(request):
+    """URLs of the item snapshots of closed years, e.g. ?years=2023,2024 (see core/snapshots.py)"""
+    try:
+        years = {int(y) for y in request.GET.get('years', '').split(',') if y.strip()}
+    except ValueError:
+        return JsonResponse({'error': 'years must be a comma-separated list of integers'}, status=400)
+    if not years or len(years) > MAX_SNAPSHOT_YEARS or min(years) < 1 or max(years) > 9999:
+        return JsonResponse({'error': f'Provide between 1 and {MAX_SNAPSHOT_YEARS} years'}, status=400)
+    digests = year_snapshots(request.user, years)
+    response = JsonResponse({
+        str(year): reverse('year_snapshot', args=[year, digest]) for year, digest in sorted(digests.items())
+    })
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@login_required
+def year_snapshot(request, year: int, digest: str):
+    """One year's items; only served under the snapshot's current digest"""
+    snapshot = (YearSnapshot.objects.filter(user=request.user, year=year, digest=digest)
+                .exclude(digest__startswith=PENDING).only('content').first())
+    if snapshot is None:
+        raise Http404("Snapshot is out of date; request /api/snapshots again.")
+    response = HttpResponse(snapshot.content, content_type='application/json')
+    response['Cache-Control'] = SNAPSHOT_CACHE_CONTROL
+    return response
+
+
+# Seconds between keep-alive comments on an idle stream, so proxies keep the connection open
+STREAM_KEEPALIVE = 25
+
+
+async def stream_api(request: HttpRequest):
+    """Server-sent events stream of change notifications for the current user (ASGI only)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be tied up by the endless response
+        return JsonResponse({'error': 'Streaming requires the ASGI server (colendar_site.asgi)'}, status=501)
+
+    queue = broadcaster.subscribe(user.id)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {message['version']}\nevent: change\ndata: {json.dumps(message)}\n\n"
+        finally:
+            broadcaster.unsubscribe(user.id, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@csrf_exempt
+def dedupe_items(request):
+    """Report (GET) or merge (POST) items of the current user sharing event, date and title.
+
+    POST keeps the oldest item of each group and appends the other copies' notes to it
+    unless {"merge_notes": false} is sent.
+    """
+    if request.method == 'GET':
+        groups = duplicate_groups(request.user)
+        return JsonResponse({'groups': len(groups), 'duplicates': sum(g['count'] - 1 for g in groups)})
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['GET', 'POST'])
+
+    result = merge_duplicates(request.user, merge_notes=_json(request).get('merge_notes', True))
+    mark_items_changed(result['event_ids'])
+    if result['deleted']:
+        invalidate_snapshots(request.user.id)
+    for event_id in result['event_ids']:
+        notify_change(request.user.id, 'event', event_id, 'items')
+    return JsonResponse({'groups': result['groups'], 'deleted': result['deleted'], 'merged': result['merged']})
@@ -0,0 +1,22 @@
+"""Gunicorn settings, read automatically when gunicorn starts in this directory.
+
+Only needed for metrics in multiprocess mode (PROMETHEUS_MULTIPROC_DIR, see core/metrics.py).
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to the new workers' values
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in glob.glob(os.path.join(path, "*.db")):
+            os.remove(name)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Traffic-replay load test for a locally running Colendar server.
+
+Logs in a pool of synthetic users and replays the request mix that
+core/static/core/app.js sends:
+
+  - initial load:      GET /api/events
+  - day click:         GET /api/items?date=YYYY-MM-DD&fields=...
+  - event highlight:   GET /api/snapshots?years=... plus the snapshot URLs not
+                       fetched yet, then GET /api/items?event_ids=...&start=&end=&fields=...
+  - paint burst:       several concurrent POST /api/items on consecutive days
+  - delete:            DELETE /api/items/<id>
+
+It only uses the standard library (asyncio streams speaking HTTP/1.1), so it
+can run from the project virtualenv without extra packages. Each user keeps up
+to --connections keep-alive connections open, as a browser tab does, so the
+numbers do not include a TCP handshake per request.
+
+Typical run against gunicorn (threaded workers; sync workers close the
+connection after every response):
+
+    gunicorn colendar_site.wsgi -w 4 --threads 8 -b 127.0.0.1:8001 &
+    python scripts/loadtest.py --seed-users 300
+    python scripts/loadtest.py --users 300 --duration 60
+
+`--seed-users` bootstraps Django from this checkout and creates the synthetic
+accounts (loadtest-N@example.com) directly in the configured database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+USER_EMAIL = "loadtest-{}@example.com"
+USER_PASSWORD = "loadtest-password"
+
+# Same projection app.js asks for (ITEM_FIELDS).
+ITEM_FIELDS = "event_id,date,title,time,notes"
+
+# Relative weights of the user actions, roughly what a session in app.js looks like.
+ACTION_WEIGHTS = {
+    "events": 5,
+    "day_click": 40,
+    "highlight": 20,
+    "paint_burst": 15,
+    "delete": 20,
+}
+
+
+def seed_users(count: int) -> None:
+    """Create `count` synthetic users (and their sites row) in the configured database."""
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "colendar_site.settings")
+    import django
+
+    django.setup()
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from allauth.account.models import EmailAddress
+
+    # Hash once: PBKDF2 for hundreds of users would dominate the setup time.
+    password = make_password(USER_PASSWORD)
+    emails = [USER_EMAIL.format(i) for i in range(count)]
+    existing = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+    User.objects.bulk_create([
+        User(username=email.split("@")[0], email=email, password=password)
+        for email in emails if email not in existing
+    ])
+    users = User.objects.filter(email__in=emails)
+    verified = set(EmailAddress.objects.filter(user__in=users).values_list("email", flat=True))
+    EmailAddress.objects.bulk_create([
+        EmailAddress(user=u, email=u.email, primary=True, verified=True)
+        for u in users if u.email not in verified
+    ])
+    print(f"Seeded {count} users ({count - len(existing)} new)")
+
+
+class Response:
+    def __init__(self, status: int, headers: list, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+class Client:
+    """Tiny cookie-aware HTTP/1.1 client with a small pool of keep-alive connections.
+
+    Like a browser, it reuses idle connections and opens at most `max_connections`
+    to the server; further concurrent requests (a paint burst) wait for a free one.
+    """
+
+    def __init__(self, base_url: str, timeout: float, max_connections: int = 6):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.opened = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None,
+                      headers: Optional[dict] = None) -> Response:
+        async with self._slots:
+            return await asyncio.wait_for(self._request(method, path, body, headers or {}), self.timeout)
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+    def _head(self, method: str, path: str, body: Optional[bytes], headers: dict) -> bytes:
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            "Accept: application/json",
+        ]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        if "csrftoken" in self.cookies:
+            lines.append(f"X-CSRFToken: {self.cookies['csrftoken']}")
+        lines.append(f"Referer: http://{self.host}:{self.port}/")
+        for k, v in headers.items():
+            lines.append(f"{k}: {v}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _request(self, method: str, path: str, body: Optional[bytes], headers: dict) -> Response:
+        # Built per request: the cookies may have changed since the last one.
+        message = self._head(method, path, body, headers) + (body or b"")
+        while True:
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                self.opened += 1
+            try:
+                try:
+                    writer.write(message)
+                    await writer.drain()
+                    status_line = await reader.readline()
+                except ConnectionError:
+                    if not reused:
+                        raise
+                    status_line = b""
+                if not status_line and reused:
+                    # The server dropped the idle connection (keep-alive timeout); retry on a new one
+                    writer.close()
+                    continue
+                status, resp_headers, payload, keep_alive = await self._read_response(method, reader, status_line)
+            except BaseException:  # including a timeout's cancellation: the connection is mid-response
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            break
+
+        for k, v in resp_headers:
+            if k == "set-cookie":
+                cookie = SimpleCookie()
+                cookie.load(v)
+                for name, morsel in cookie.items():
+                    self.cookies[name] = morsel.value
+        return Response(status, resp_headers, payload)
+
+    async def _read_response(self, method: str, reader, status_line: bytes) -> tuple:
+        status = int(status_line.split()[1])
+        resp_headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers.append((name.strip().lower(), value.strip()))
+        header = dict(resp_headers)
+        # HTTP/1.0 servers (and gunicorn's sync workers) close after every response
+        keep_alive = status_line.startswith(b"HTTP/1.1") and header.get("connection", "").lower() != "close"
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            payload = b""
+        elif header.get("transfer-encoding", "").lower() == "chunked":
+            payload = await self._read_chunked(reader)
+        elif "content-length" in header:
+            payload = await reader.readexactly(int(header["content-length"]))
+        else:
+            payload = await reader.read()  # delimited by the server closing the connection
+            keep_alive = False
+        return status, resp_headers, payload, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader) -> bytes:
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        while await reader.readline() not in (b"\r\n", b"\n", b""):  # trailers
+            pass
+        return b"".join(chunks)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.requests = Counter()
+
+    def record(self, label: str, seconds: float, error: Optional[str] = None) -> None:
+        self.requests[label] += 1
+        self.latencies[label].append(seconds)
+        if error:
+            self.errors[(label, error)] += 1
+
+    @staticmethod
+    def percentile(values: list, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def report(self, elapsed: float) -> None:
+        total = sum(self.requests.values())
+        failed = sum(self.errors.values())
+        print(f"\n{total} requests in {elapsed:.1f}s -> {total / elapsed:.1f} req/s, "
+              f"{failed} errors ({100.0 * failed / max(total, 1):.2f}%)\n")
+        print(f"{'endpoint':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for label in sorted(self.latencies):
+            lat = self.latencies[label]
+            print(f"{label:<22}{len(lat):>8}"
+                  f"{self.percentile(lat, 50) * 1000:>10.1f}"
+                  f"{self.percentile(lat, 95) * 1000:>10.1f}"
+                  f"{self.percentile(lat, 99) * 1000:>10.1f}"
+                  f"{max(lat) * 1000:>10.1f}")
+        if self.errors:
+            print("\nerrors:")
+            for (label, error), count in self.errors.most_common():
+                print(f"  {label:<20} {error:<28} {count}")
+
+
+def classify_error(resp: Optional[Response], exc: Optional[BaseException]) -> Optional[str]:
+    if exc is not None:
+        return type(exc).__name__
+    if resp.status < 400:
+        return None
+    if b"database is locked" in resp.body:
+        return f"{resp.status} sqlite-locked"
+    return str(resp.status)
+
+
+class SyntheticUser:
+    def __init__(self, index: int, args, stats: Stats):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.client = Client(args.url, args.timeout, args.connections)
+        self.rng = random.Random(args.seed + index)
+        self.event_ids = []
+        self.item_ids = []
+        # Snapshot URLs are immutable, so the browser only fetches each one once.
+        self.snapshot_urls = set()
+
+    async def call(self, label: str, method: str, path: str, payload=None) -> Optional[Response]:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        started = time.perf_counter()
+        resp, exc = None, None
+        try:
+            resp = await self.client.request(method, path, body, headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            exc = e
+        self.stats.record(label, time.perf_counter() - started, classify_error(resp, exc))
+        return resp if exc is None else None
+
+    async def login(self) -> bool:
+        await self.client.request("GET", "/accounts/login/")
+        form = urlencode({
+            "login": USER_EMAIL.format(self.index),
+            "password": USER_PASSWORD,
+            "csrfmiddlewaretoken": self.client.cookies.get("csrftoken", ""),
+        }).encode("utf-8")
+        resp = await self.client.request("POST", "/accounts/login/", form,
+                                         {"Content-Type": "application/x-www-form-urlencoded"})
+        # allauth answers JSON clients with 200 instead of a redirect; the session cookie is what counts.
+        return resp.status < 400 and "sessionid" in self.client.cookies
+
+    def random_date(self) -> str:
+        year = date.today().year + self.rng.choice((-1, 0, 0, 0, 1))
+        return (date(year, 1, 1) + timedelta(days=self.rng.randrange(365))).isoformat()
+
+    async def load_events(self) -> None:
+        resp = await self.call("GET /api/events", "GET", "/api/events")
+        if resp is not None and resp.status == 200:
+            self.event_ids = [ev["id"] for ev in resp.json()]
+        if not self.event_ids:
+            resp = await self.call("POST /api/events", "POST", "/api/events",
+                                   {"title": f"Load {self.index}", "color": "#3B82F6"})
+            if resp is not None and resp.status == 201:
+                self.event_ids.append(resp.json()["id"])
+
+    async def load_date(self, day: str) -> None:
+        await self.call("GET /api/items?date", "GET", f"/api/items?date={day}&fields={ITEM_FIELDS}")
+
+    async def day_click(self) -> None:
+        await self.load_date(self.random_date())
+
+    async def highlight(self) -> None:
+        """Mirror loadItemsForEvents: past years from snapshots, the rest in one grouped request."""
+        if not self.event_ids:
+            return
+        ids = self.rng.sample(self.event_ids, self.rng.randint(1, min(3, len(self.event_ids))))
+        current = date.today().year
+        # The calendar renders year-1..year+1 and grows as the user scrolls back.
+        first = current - 1 - self.rng.choice((0, 0, 0, 1, 2))
+        end = f"{current + 1}-12-31"
+        years = ",".join(str(y) for y in range(first, current))
+        resp = await self.call("GET /api/snapshots", "GET", f"/api/snapshots?years={years}")
+        urls = resp.json() if resp is not None and resp.status == 200 else {}
+        live_year = first
+        while str(live_year) in urls:
+            live_year += 1
+        new_urls = [url for url in urls.values() if url not in self.snapshot_urls]
+        self.snapshot_urls.update(new_urls)
+        params = f"event_ids={','.join(map(str, ids))}&start={live_year}-01-01&end={end}&fields={ITEM_FIELDS}"
+        await asyncio.gather(
+            *(self.call("GET /api/snapshots/<year>/<digest>", "GET", url) for url in new_urls),
+            self.call("GET /api/items?event_ids", "GET", f"/api/items?{params}"),
+        )
+
+    async def paint_burst(self) -> None:
+        if not self.event_ids:
+            return
+        event_id = self.rng.choice(self.event_ids)
+        start = date.fromisoformat(self.random_date())
+        days = [start + timedelta(days=i) for i in range(self.rng.randint(3, self.args.burst))]
+        results = await asyncio.gather(*(
+            self.call("POST /api/items", "POST", "/api/items",
+                      {"event_id": event_id, "date": d.isoformat(), "title": "Load item"})
+            for d in days
+        ))
+        for resp in results:
+            if resp is not None and resp.status == 201:
+                self.item_ids.append(resp.json()["id"])
+        # app.js reloads each painted day after the POST resolves.
+        await asyncio.gather(*(self.load_date(d.isoformat()) for d in days))
+
+    async def delete(self) -> None:
+        if self.item_ids:
+            item_id = self.item_ids.pop(self.rng.randrange(len(self.item_ids)))
+            await self.call("DELETE /api/items/<id>", "DELETE", f"/api/items/{item_id}")
+
+    async def run(self, deadline: float) -> None:
+        try:
+            await self.session(deadline)
+        finally:
+            self.client.close()
+
+    async def session(self, deadline: float) -> None:
+        try:
+            if not await self.login():
+                self.stats.record("login", 0.0, "login-failed")
+                return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            self.stats.record("login", 0.0, type(e).__name__)
+            return
+        await self.load_events()
+
+        actions = list(ACTION_WEIGHTS)
+        weights = [ACTION_WEIGHTS[a] for a in actions]
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            await getattr(self, action if action != "events" else "load_events")()
+            await asyncio.sleep(self.rng.expovariate(1.0 / self.args.think_time))
+
+
+async def main_async(args) -> None:
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    users = [SyntheticUser(i, args, stats) for i in range(args.users)]
+
+    # Stagger logins so the server is not hit by a single thundering herd.
+    async def start(user: SyntheticUser) -> None:
+        await asyncio.sleep(user.rng.uniform(0, args.ramp_up))
+        await user.run(deadline)
+
+    await asyncio.gather(*(start(u) for u in users))
+    stats.report(time.perf_counter() - started)
+    print(f"\n{sum(u.client.opened for u in users)} TCP connections opened")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="server base URL")
+    parser.add_argument("--users", type=int, default=200, help="concurrent synthetic users")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users log in")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean pause between actions (s)")
+    parser.add_argument("--burst", type=int, default=8, help="max POSTs in a paint burst")
+    parser.add_argument("--connections", type=int, default=6,
+                        help="keep-alive connections per user (browsers open 6 per host)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--seed-users", type=int, metavar="N",
+                        help="create N synthetic users in the local database and exit")
+    args = parser.parse_args()
+
+    if args.seed_users:
+        seed_users(args.seed_users)
+        return
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()